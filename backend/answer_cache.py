@@ -0,0 +1,73 @@
+import itertools
+import os
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from cache import TTLCache
+load_dotenv()
+
+# -------------------------------
+# Semantic answer cache
+# -------------------------------
+# Answers are keyed by the query embedding: a new question reuses a cached
+# answer when its cosine similarity to a cached question is above the threshold.
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+REPLAY_CHUNK_CHARS = 64
+
+_entries = TTLCache(maxsize=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)
+_ids = itertools.count()
+_lock = threading.Lock()
+_corpus_version = 0
+stats = {"hits": 0, "misses": 0}
+
+
+def _normalize(vector):
+    v = np.asarray(vector, dtype=np.float32)
+    return v / (np.linalg.norm(v) or 1)
+
+
+def lookup(query_vector):
+    """Return the cached answer for the most similar question, or None"""
+    entries = _entries.items()
+    if entries:
+        q = _normalize(query_vector)
+        vectors = np.stack([e[1]["vector"] for e in entries])
+        scores = vectors @ q
+        best = int(np.argmax(scores))
+        entry = entries[best][1]
+        if scores[best] >= ANSWER_CACHE_THRESHOLD and entry["version"] == _corpus_version:
+            stats["hits"] += 1
+            return entry["answer"]
+    stats["misses"] += 1
+    return None
+
+
+def store(query_vector, answer: str, version: int):
+    """Cache an answer computed against corpus `version` (from current_version())"""
+    if not answer or version != _corpus_version:
+        return
+    _entries.set(next(_ids), {"vector": _normalize(query_vector), "answer": answer, "version": version})
+
+
+def current_version() -> int:
+    return _corpus_version
+
+
+def invalidate():
+    """Drop every cached answer; called whenever the indexed corpus changes"""
+    global _corpus_version
+    with _lock:
+        _corpus_version += 1
+        _entries.clear()
+
+
+def replay_chunks(answer: str):
+    """Split a cached answer into stream-sized pieces"""
+    for start in range(0, len(answer), REPLAY_CHUNK_CHARS):
+        yield answer[start:start + REPLAY_CHUNK_CHARS]
+
+
+def cache_stats() -> dict:
+    return dict(stats, size=len(_entries), corpus_version=_corpus_version)
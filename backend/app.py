@@ -1,8 +1,9 @@
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-import os, uuid, datetime, json, asyncio
+import os, uuid, datetime, json, asyncio, base64, time, threading
 import pytz
-from db import db_insert, db_display, db_update
+from db import db_insert, db_display, transaction, close_pool, dedicated_connection, PoolTimeout
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -14,22 +15,54 @@ import uvicorn
 import rag_pipeline
 import rag_pipeline2 
 import bot
+import context_builder
+import embeddings
+import intent_router
+import jobs
+import images
+import vector_lifecycle
+from cache import TTLCache
+from embeddings import embed_query
+import answer_cache
+import response_cache
+import sessions
+import offload
+from offload import run_blocking
+from streaming import coalesce, deltas
 from typing import Dict
 # Add this import at the top with other imports
 from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi.encoders import jsonable_encoder
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Resolved principals keyed by token subject (email)
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+principal_cache = TTLCache(maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096")), ttl=PRINCIPAL_CACHE_TTL)
+# Trust the signed user_id/name claims in the token and skip the lookup entirely
+TRUST_TOKEN_CLAIMS = os.getenv("TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+def invalidate_principal(email: str):
+    principal_cache.pop(email)
+
 def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        
+
+        if TRUST_TOKEN_CLAIMS and payload.get("user_id") and payload.get("name"):
+            return {"user_id": payload["user_id"], "name": payload["name"], "email": email}
+
+        cached = principal_cache.get(email)
+        if cached is not None:
+            return dict(cached)
+
         # Get user details from database
         query = "SELECT id, name, email FROM consumer.userdetails WHERE email=%s"
         user = db_display(query, (email,))
@@ -37,7 +70,9 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
             raise HTTPException(status_code=401, detail="User not found")
         
         user_id, name, email = user[0]
-        return {"user_id": user_id, "name": name, "email": email}
+        principal = {"user_id": user_id, "name": name, "email": email}
+        principal_cache.set(email, principal)
+        return dict(principal)
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -56,7 +91,25 @@ class BlogItem(BaseModel):
     createdAt: str
     createdTime: str
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs.start_workers()
+    vector_lifecycle.start_sweeper()
+    rag_pipeline.start_lexical_index()
+    images.resume_pending()
+    yield
+    vector_lifecycle.stop_sweeper()
+    jobs.stop_workers()
+    images.shutdown()
+    offload.shutdown()
+    close_pool()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    # Every pooled connection stayed busy for DB_POOL_TIMEOUT: shed load instead of a 500
+    return JSONResponse(status_code=503, content={"detail": "Server busy, please retry"}, headers={"Retry-After": "1"})
 
 origins = [
     "http://localhost:5173",
@@ -68,6 +121,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
  
 BASE_DIR = os.path.dirname(__file__)
@@ -86,14 +140,16 @@ def signup(item: Item):
     password = get_password_hash(item.password)
     id = str(uuid.uuid4())
     
-    query = "SELECT id FROM consumer.userdetails WHERE email=%s"
-    user = db_display(query, (email,))
-    if user:
-        raise HTTPException(status_code=400, detail="Email already exists")
-    
-    query = "insert into consumer.userdetails values(%s,%s,%s,%s)"
-    values = (id, name, email, password)
-    db_insert(query, values)
+    with transaction():
+        query = "SELECT id FROM consumer.userdetails WHERE email=%s"
+        user = db_display(query, (email,))
+        if user:
+            raise HTTPException(status_code=400, detail="Email already exists")
+
+        query = "insert into consumer.userdetails values(%s,%s,%s,%s)"
+        values = (id, name, email, password)
+        db_insert(query, values)
+    invalidate_principal(email)
     return "done"
 
 @app.post("/login")
@@ -107,11 +163,78 @@ def login(item: LoginItem):
     user_id, name, email, hashed_password = user[0]
     if not verify_password(password, hashed_password):
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    access_token = create_access_token(data={"sub": email})
+    access_token = create_access_token(data={"sub": email, "user_id": user_id, "name": name})
     return JSONResponse({"access_token": access_token, "token_type": "bearer", "user_id": user_id, "name": name})
 
+def validate_upload(image: UploadFile):
+    if not image.content_type or not image.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="Only image uploads are allowed.")
+    _, ext = os.path.splitext(image.filename)
+    ext = ext.lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported image format.")
+    return ext
+
+def save_upload(image: UploadFile, blog_id: str, ext: str):
+    filename = f"{blog_id}{ext}"
+    filepath = os.path.join(UPLOAD_DIR, filename)
+    bytes_written = 0
+    max_bytes = MAX_UPLOAD_MB * 1024 * 1024
+    with open(filepath, "wb") as f:
+        while True:
+            chunk = image.file.read(1024 * 1024)  # 1MB chunks
+            if not chunk:
+                break
+            bytes_written += len(chunk)
+            if bytes_written > max_bytes:
+                try:
+                    f.close()
+                    os.remove(filepath)
+                except Exception:
+                    pass
+                raise HTTPException(status_code=413, detail=f"Image too large (>{MAX_UPLOAD_MB}MB).")
+            f.write(chunk)
+
+    return f"/media/uploads/{filename}"
+
+def remove_upload(image_url: str):
+    try:
+        os.remove(os.path.join(MEDIA_ROOT, image_url.removeprefix("/media/")))
+    except OSError:
+        pass
+
+EXCERPT_CHARS = 280
+
+def make_excerpt(content: str, limit: int = EXCERPT_CHARS):
+    """Feed preview: whitespace collapsed, cut on a word boundary
+    (migrations/006_blogdetails_excerpt.sql backfills with the same rule)"""
+    text = " ".join(content.split())
+    if len(text) <= limit:
+        return text
+    cut = text[:limit + 1]
+    cut = cut.rsplit(" ", 1)[0] if " " in cut else text[:limit]
+    return cut + "…"
+
+def insert_blog(values: tuple):
+    query = """
+        INSERT INTO blog.blogdetails
+            (id, user_id, title, content, "delete", createdat, "time", image_url, excerpt)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    """
+    # Row and indexing job commit together; the vector upsert runs in jobs.py workers
+    with transaction():
+        db_insert(query, values)
+        jobs.enqueue_index_job(values[0])
+
+background_tasks = set()
+
+def log_speculative_failure(task: asyncio.Task, blog_id: str):
+    # Not fatal: the index job embeds (and retries) on its own
+    if not task.cancelled() and task.exception():
+        print(f"Speculative embedding failed for {blog_id}: {task.exception()}")
+
 @app.post("/addblog")
-def addblog(
+async def addblog(
     title: str = Form(...),
     content: str = Form(...),
     image: UploadFile | None = File(None),
@@ -120,88 +243,245 @@ def addblog(
     blog_id = str(uuid.uuid4())
     user_id = current_user["user_id"]
     delete = 0
-    if not bot.check_blog_content_langchain(title, content):
+    started = time.perf_counter()
+    timings = {}
+
+    async def timed(stage, func, *args):
+        stage_start = time.perf_counter()
+        try:
+            return await run_blocking(func, *args)
+        finally:
+            timings[stage] = (time.perf_counter() - stage_start) * 1000
+
+    ext = validate_upload(image) if image and image.filename else None
+
+    # Cached verdicts and local prefilter rejections settle before any
+    # speculative work starts; only the LLM check overlaps with it
+    verdict = await timed("prefilter", bot.quick_verdict, title, content)
+    if verdict is False:
         raise HTTPException(status_code=410, detail="inappropriate content detected")
-    image_url = None
-    if image and image.filename:
-        if not image.content_type or not image.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="Only image uploads are allowed.")
-        _, ext = os.path.splitext(image.filename)
-        ext = ext.lower()
-        if ext not in ALLOWED_EXTENSIONS:
-            raise HTTPException(status_code=400, detail="Unsupported image format.")
-
-        filename = f"{blog_id}{ext}"
-        filepath = os.path.join(UPLOAD_DIR, filename)  # Change this line to use UPLOAD_DIR
-        bytes_written = 0
-        max_bytes = MAX_UPLOAD_MB * 1024 * 1024
-        with open(filepath, "wb") as f:
-            while True:
-                chunk = image.file.read(1024 * 1024)  # 1MB chunks
-                if not chunk:
-                    break
-                bytes_written += len(chunk)
-                if bytes_written > max_bytes:
-                    try:
-                        f.close()
-                        os.remove(filepath)
-                    except Exception:
-                        pass
-                    raise HTTPException(status_code=413, detail=f"Image too large (>{MAX_UPLOAD_MB}MB).")
-                f.write(chunk)
-
-        image_url = f"/media/uploads/{filename}"  # Change this line to include uploads/
+
+    # The speculative embedding only warms the embedding cache for the index
+    # job that runs after commit, so the request never waits for it
+    username = current_user["name"]
+    blog_text = rag_pipeline.format_blog_text(title, username, content)
+    stop_embedding = threading.Event()
+    embedding = asyncio.create_task(run_blocking(rag_pipeline.embed_blog, blog_text, stop_embedding))
+    background_tasks.add(embedding)
+    embedding.add_done_callback(background_tasks.discard)
+    embedding.add_done_callback(lambda task: log_speculative_failure(task, blog_id))
+    image_write = asyncio.create_task(timed("image", save_upload, image, blog_id, ext)) if ext else None
+
+    if verdict is None and not await timed("moderation", bot.llm_verdict, title, content):
+        # Discard speculative work
+        stop_embedding.set()
+        if image_write:
+            image_url = (await asyncio.gather(image_write, return_exceptions=True))[0]
+            if isinstance(image_url, str):
+                remove_upload(image_url)
+        raise HTTPException(status_code=410, detail="inappropriate content detected")
+
+    image_url = await image_write if image_write else None
 
     # Set timestamps on server side with IST timezone
     ist = pytz.timezone('Asia/Kolkata')
     now = datetime.datetime.now(ist)
     created_at = now.date().isoformat()  # "2025-08-29"
     created_time = now.time().replace(microsecond=0).isoformat()  # "14:35:42" (clean IST time)
-    username=current_user["name"]
-    rag_pipeline.add_blog_to_pinecone(blog_id, f"{title}\nby {username}\n{content}")
-    query = """
-        INSERT INTO blog.blogdetails
-            (id, user_id, title, content, "delete", createdat, "time", image_url)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-    """
-    values = (blog_id, user_id, title, content, delete, created_at, created_time, image_url)
-    db_insert(query, values)
+    values = (blog_id, user_id, title, content, delete, created_at, created_time, image_url, make_excerpt(content))
+    await timed("db", insert_blog, values)
+    response_cache.invalidate(response_cache.feed_group(), response_cache.user_group(user_id))
+    if image_url:
+        # Thumbnails/WebP variants are built off-request; the raw upload is served until then
+        images.submit(blog_id, image_url)
 
+    timings["total"] = (time.perf_counter() - started) * 1000
+    server_timing = ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
+    return JSONResponse(
+        {
+            "message": "Blog created successfully",
+            "blog_id": blog_id,
+            "image_url": image_url,
+            "image_status": "pending" if image_url else None,
+            "index_status": "pending",
+        },
+        headers={"Server-Timing": server_timing},
+    )
+
+@app.get("/indexstatus/{id}")
+def index_status(id: str):
+    job = jobs.get_job(id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No indexing job for this blog")
+    return job
+
+@app.get("/stats")
+def service_stats(current_user: dict = Depends(get_current_user)):
+    """Cache, moderation and routing counters since the process started"""
     return {
-        "message": "Blog created successfully",
-        "blog_id": blog_id,
-        "image_url": image_url,
+        "moderation": bot.moderation_stats(),
+        "context": context_builder.context_stats(),
+        "embeddings": embeddings.cache_stats(),
+        "speculation": rag_pipeline2.speculation_stats,
+        "intent_router": intent_router.stats,
+        "response_cache": response_cache.cache_stats(),
+        "answer_cache": answer_cache.cache_stats(),
     }
 
+def encode_cursor(*key):
+    raw = json.dumps([str(k) for k in key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int):
+    """Cursor -> list of `size` strings (what encode_cursor wrote); 400 otherwise"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, list) or len(key) != size or not all(isinstance(k, str) for k in key):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+def decode_feed_cursor(cursor: str):
+    """(createdat, time, id) cursor of /getblogs and /myblogs"""
+    created_at, created_time, last_id = decode_cursor(cursor, 3)
+    try:
+        datetime.date.fromisoformat(created_at)
+        datetime.time.fromisoformat(created_time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, created_time, last_id
+
+# Response field -> column for list endpoints; full content only when asked for
+FEED_FIELDS = {
+    "id": "b.id",
+    "title": "b.title",
+    "excerpt": "b.excerpt",
+    "content": "b.content",
+    "createdAt": "b.createdat",
+    "createdTime": "b.time",
+    "author": "u.name",
+    "imageUrl": "b.image_url",
+    "imageVariants": "b.image_variants",
+}
+DEFAULT_FEED_FIELDS = ("id", "title", "excerpt", "createdAt", "author", "createdTime", "imageUrl", "imageVariants")
+
+def parse_fields(fields: str | None, allowed: dict, default: tuple):
+    """'title,imageUrl' -> ("id", "title", "imageUrl"); id is always returned"""
+    if not fields:
+        return default
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id"] + requested))
+
+FEED_MAX_LIMIT = 50
+
 @app.get("/getblogs")
-def get_blogs(page: int = 1, limit: int = 5):
-    offset = (page - 1) * limit
-    query = """
-        SELECT b.id, b.title, b.content, b.createdat as createdAt, u.name, b.time as createdTime, b.image_url
+def get_blogs(request: Request, page: int = 1, limit: int = 5, cursor: str | None = None, fields: str | None = None):
+    # Cached until addblog/delete_blog invalidates the feed (see response_cache.py)
+    page = max(1, page)
+    limit = max(1, min(limit, FEED_MAX_LIMIT))
+    selected = parse_fields(fields, FEED_FIELDS, DEFAULT_FEED_FIELDS)
+    key = (response_cache.feed_group(), page if not cursor else None, limit, cursor, selected)
+    return response_cache.cached_json(request, key, lambda: fetch_blogs(page, limit, cursor, selected))
+
+def fetch_blogs(page: int, limit: int, cursor: str | None, selected: tuple = DEFAULT_FEED_FIELDS):
+    # Keyset mode: pass back next_cursor instead of page for constant-cost deep pages
+    # (served by blogdetails_feed_idx, see migrations/001_blogdetails_feed_index.sql)
+    if cursor:
+        created_at, created_time, last_id = decode_feed_cursor(cursor)
+        where = "AND (b.createdat, b.time, b.id) < (%s, %s, %s)"
+        params = (created_at, created_time, last_id, limit)
+        paging = "LIMIT %s"
+    else:
+        offset = (page - 1) * limit
+        where = ""
+        params = (limit, offset)
+        paging = "LIMIT %s OFFSET %s"
+    # Only the requested columns are read; the trailing sort key feeds next_cursor
+    columns = ", ".join(FEED_FIELDS[f] for f in selected)
+    query = f"""
+        SELECT {columns}, b.createdat, b.time, b.id
         FROM blog.blogdetails b
         JOIN consumer.userdetails u ON b.user_id = u.id
-        WHERE b.delete = 0
-        ORDER BY b.time DESC
-        LIMIT %s OFFSET %s
+        WHERE b.delete = 0 {where}
+        ORDER BY b.createdat DESC, b.time DESC, b.id DESC
+        {paging}
     """
-    blogs = db_display(query, (limit, offset))
-    blog_list = []
-    for blog in blogs:
-        blog_list.append({
-            "id": blog[0],
-            "title": blog[1],
-            "content": blog[2],
-            "createdAt": blog[3],
-            "author": blog[4],
-            "createdTime": blog[5],
-            "imageUrl": blog[6],
+    blogs = db_display(query, params)
+    blog_list = [dict(zip(selected, blog)) for blog in blogs]
+    next_cursor = None
+    if len(blogs) == limit:
+        next_cursor = encode_cursor(*blogs[-1][-3:])
+    return {"blogs": blog_list, "next_cursor": next_cursor}
+
+SEARCH_MAX_LIMIT = 50
+SEARCH_HEADLINE_OPTIONS = "MaxFragments=2, MaxWords=30, MinWords=10, StartSel=<mark>, StopSel=</mark>"
+# Post content is HTML-escaped before ts_headline, so <mark> is the only markup in a snippet
+SEARCH_ESCAPED_CONTENT = "replace(replace(replace(replace(r.content, '&', '&amp;'), '<', '&lt;'), '>', '&gt;'), '\"', '&quot;')"
+
+@app.get("/search")
+def search_blogs(q: str, limit: int = 10, cursor: str | None = None):
+    # Full-text search over blogdetails_search_idx (migrations/004-005), ranked by ts_rank;
+    # keyset pagination on (rank, id) via next_cursor
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Missing search query")
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    where = ""
+    params = [SEARCH_HEADLINE_OPTIONS, q]
+    if cursor:
+        last_rank, last_id = decode_cursor(cursor, 2)
+        try:
+            last_rank = float(last_rank)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        where = "AND (ts_rank(b.search_vector, query), b.id) < (%s::real, %s)"
+        params += [last_rank, last_id]
+    params.append(limit)
+    query = f"""
+        SELECT r.id, r.title, ts_headline('english', {SEARCH_ESCAPED_CONTENT}, r.query, %s) AS snippet,
+               r.createdat, r.name, r.time, r.image_url, r.rank
+        FROM (
+            SELECT b.id, b.title, b.content, b.createdat, u.name, b.time, b.image_url,
+                   query, ts_rank(b.search_vector, query) AS rank
+            FROM blog.blogdetails b
+            JOIN consumer.userdetails u ON b.user_id = u.id,
+                 websearch_to_tsquery('english', %s) query
+            WHERE b.delete = 0 AND b.search_vector @@ query {where}
+            ORDER BY rank DESC, b.id DESC
+            LIMIT %s
+        ) r
+        ORDER BY r.rank DESC, r.id DESC
+    """
+    rows = db_display(query, tuple(params))
+    results = []
+    for row in rows:
+        results.append({
+            "id": row[0],
+            "title": row[1],
+            "snippet": row[2],
+            "createdAt": row[3],
+            "author": row[4],
+            "createdTime": row[5],
+            "imageUrl": row[6],
+            "rank": row[7],
         })
-    return {"blogs": blog_list}
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1][7], rows[-1][0])
+    return {"results": results, "next_cursor": next_cursor}
 
 @app.get("/getblog/{id}")
-def getblog(id: str):
+def getblog(id: str, request: Request):
+    # Full post body; list endpoints only carry the excerpt
+    return response_cache.cached_json(request, (response_cache.blog_group(id),), lambda: fetch_blog(id))
+
+def fetch_blog(id: str):
     query = """
-        SELECT b.id, b.title, b.content, b.createdat as createdAt, b.time as createdTime, u.name, b.image_url
+        SELECT b.id, b.title, b.content, b.createdat as createdAt, b.time as createdTime, u.name, b.image_url, b.image_variants
         FROM blog.blogdetails b
         JOIN consumer.userdetails u ON b.user_id = u.id
         WHERE b.id = %s AND b.delete = 0
@@ -218,32 +498,136 @@ def getblog(id: str):
         "createdTime": row[4],
         "author": row[5],
         "imageUrl": row[6],
+        "imageVariants": row[7],
     }
 
+MY_BLOG_FIELDS = {f: column for f, column in FEED_FIELDS.items() if f != "author"}
+DEFAULT_MY_BLOG_FIELDS = tuple(f for f in DEFAULT_FEED_FIELDS if f != "author")
+
+MY_BLOGS_MAX_LIMIT = 100
+EXPORT_FETCH_SIZE = 200
+# Exports hold a connection for the whole download, so they get their own
+# (outside the request pool), a cap, and a server-side stall timeout
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "4"))
+EXPORT_IDLE_TIMEOUT_MS = int(os.getenv("EXPORT_IDLE_TIMEOUT_MS", "60000"))
+export_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)
+
 @app.get("/myblogs")
-def my_blogs(current_user: dict = Depends(get_current_user)):
+def my_blogs(
+    request: Request,
+    limit: int = 20,
+    cursor: str | None = None,
+    fields: str | None = None,
+    current_user: dict = Depends(get_current_user),
+):
+    # Newest first, keyset-paginated through next_cursor (blogdetails_author_idx, migrations/007)
     user_id = current_user["user_id"]
-    query = "SELECT b.id, b.title, b.content, b.createdat as createdAt, b.time as createdTime, b.image_url FROM blog.blogdetails b WHERE b.user_id = %s AND b.delete = 0"
-    blogs = db_display(query, (user_id,))
-    blog_list = []
-    for blog in blogs:
-        blog_list.append({
-            "id": blog[0],
-            "title": blog[1],
-            "content": blog[2],
-            "createdAt": blog[3],
-            "createdTime": blog[4],
-            "imageUrl": blog[5]
-        })
-    return {"blogs": blog_list}
+    limit = max(1, min(limit, MY_BLOGS_MAX_LIMIT))
+    selected = parse_fields(fields, MY_BLOG_FIELDS, DEFAULT_MY_BLOG_FIELDS)
+    key = (response_cache.user_group(user_id), limit, cursor, selected)
+    return response_cache.cached_json(request, key, lambda: fetch_my_blogs(user_id, limit, cursor, selected), private=True)
+
+def fetch_my_blogs(user_id: str, limit: int, cursor: str | None, selected: tuple = DEFAULT_MY_BLOG_FIELDS):
+    where = ""
+    params = [user_id]
+    if cursor:
+        created_at, created_time, last_id = decode_feed_cursor(cursor)
+        where = "AND (b.createdat, b.time, b.id) < (%s, %s, %s)"
+        params += [created_at, created_time, last_id]
+    params.append(limit)
+    columns = ", ".join(MY_BLOG_FIELDS[f] for f in selected)
+    query = f"""
+        SELECT {columns}, b.createdat, b.time, b.id
+        FROM blog.blogdetails b
+        WHERE b.user_id = %s AND b.delete = 0 {where}
+        ORDER BY b.createdat DESC, b.time DESC, b.id DESC
+        LIMIT %s
+    """
+    blogs = db_display(query, tuple(params))
+    next_cursor = None
+    if len(blogs) == limit:
+        next_cursor = encode_cursor(*blogs[-1][-3:])
+    return {"blogs": [dict(zip(selected, blog)) for blog in blogs], "next_cursor": next_cursor}
+
+def stream_my_blogs(user_id: str, selected: tuple, release):
+    """One JSON object per line, read through a server-side (named) cursor so
+    memory stays flat however many posts the author has"""
+    columns = ", ".join(MY_BLOG_FIELDS[f] for f in selected)
+    query = f"""
+        SELECT {columns}
+        FROM blog.blogdetails b
+        WHERE b.user_id = %s AND b.delete = 0
+        ORDER BY b.createdat DESC, b.time DESC, b.id DESC
+    """
+    try:
+        # A client that stops reading leaves the transaction idle; Postgres ends it
+        options = f"-c idle_in_transaction_session_timeout={EXPORT_IDLE_TIMEOUT_MS}"
+        with dedicated_connection(options) as connection:
+            with connection.cursor(name="export_my_blogs") as cursor:
+                cursor.itersize = EXPORT_FETCH_SIZE
+                cursor.execute(query, (user_id,))
+                for row in cursor:
+                    yield json.dumps(jsonable_encoder(dict(zip(selected, row))), ensure_ascii=False) + "\n"
+    finally:
+        # Also runs when the client disconnects mid-export
+        release()
+
+@app.get("/myblogs/export")
+def export_my_blogs(fields: str | None = None, current_user: dict = Depends(get_current_user)):
+    # Full posts by default; StreamingResponse iterates the generator in the threadpool
+    selected = parse_fields(fields, MY_BLOG_FIELDS, tuple(MY_BLOG_FIELDS))
+    if not export_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Too many exports in progress, please retry", headers={"Retry-After": "5"})
+    once = threading.Lock()
+
+    def release():
+        # Called by the generator and the background task; only the first releases
+        if once.acquire(blocking=False):
+            export_slots.release()
+
+    # The background task covers a client that disconnects before the generator starts
+    return StreamingResponse(
+        stream_my_blogs(current_user["user_id"], selected, release),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="myblogs.ndjson"'},
+        background=BackgroundTask(release),
+    )
 
 @app.delete("/deleteblog/{id}")
 def delete_blog(id: str, current_user: dict = Depends(get_current_user)):
     user_id = current_user["user_id"]
-    query = "UPDATE blog.blogdetails SET delete = 1 WHERE id = %s AND user_id = %s"
-    db_update(query, (id, user_id))
+    query = "UPDATE blog.blogdetails SET delete = 1 WHERE id = %s AND user_id = %s RETURNING id"
+    with transaction():
+        deleted = db_display(query, (id, user_id))
+        if deleted:
+            # Hidden from retrieval now, purged from the index by the compaction sweep
+            vector_lifecycle.add_tombstone(id)
+    if deleted:
+        answer_cache.invalidate()
+        response_cache.invalidate(
+            response_cache.feed_group(),
+            response_cache.blog_group(id),
+            response_cache.user_group(user_id),
+        )
     return {"message": "Blog deleted successfully"}
 
+def build_conversation_history(client_id: str | None, previous_context: list):
+    """Legacy clients send the whole previous_context; others only send the
+    new message and get the server-side session (see sessions.py)"""
+    if previous_context:
+        conversation_history = ""
+        for msg in previous_context:
+            prefix = "User: " if msg["role"] == "user" else "Bot: "
+            conversation_history += f"{prefix}{msg['text']}\n"
+        return conversation_history
+    if client_id:
+        return sessions.history(client_id)
+    return ""
+
+def remember_exchange(client_id: str | None, question: str, answer: str):
+    if client_id and answer:
+        sessions.record_exchange(client_id, question, answer)
+
 @app.post("/bot_call")
 async def bot_call(request: Request):
     try:
@@ -251,20 +635,38 @@ async def bot_call(request: Request):
         body = await request.json()
         current_request = body.get("current_request", "")
         previous_context = body.get("previous_context", [])
+        client_id = body.get("client_id")
         
         # Validate request
         if not current_request:
             raise HTTPException(status_code=400, detail="Missing current_request")
             
-        # Convert message history to conversation format
-        conversation_history = ""
-        if previous_context:
-            for msg in previous_context:
-                prefix = "User: " if msg["role"] == "user" else "Bot: "
-                conversation_history += f"{prefix}{msg['text']}\n"
+        # Server-side session history unless the client sends its own
+        conversation_history = build_conversation_history(client_id, previous_context)
         
-        # Call RAG pipeline
-        response = rag_pipeline.query_rag(current_request, conversation_history)
+        # Greetings/thanks/farewells are answered before anything is embedded
+        reply = intent_router.template_reply(current_request)
+        if reply is not None:
+            remember_exchange(client_id, current_request, reply)
+            return {"response": reply}
+
+        # Fresh questions (no history) can be answered from the semantic cache
+        query_vector = None
+        if not conversation_history:
+            query_vector = await run_blocking(embed_query, current_request)
+            cached = answer_cache.lookup(query_vector)
+            if cached is not None:
+                remember_exchange(client_id, current_request, cached)
+                return {"response": cached}
+        version = answer_cache.current_version()
+
+        # Call RAG pipeline (the streaming one, collected into a single reply)
+        stream = await rag_pipeline.query_rag_stream(current_request, conversation_history)
+        response = "".join([content async for content in deltas(stream)])
+        if not rag_pipeline.is_failure(stream):
+            if query_vector is not None:
+                answer_cache.store(query_vector, response, version)
+            remember_exchange(client_id, current_request, response)
         
         # # Also index the question and answer to improve future responses
         # combined_text = f"Question: {current_request}\nAnswer: {response}"
@@ -285,32 +687,53 @@ async def bot_call_stream(request: Request):
         body = await request.json()
         current_request = body.get("current_request", "")
         previous_context = body.get("previous_context", [])
+        client_id = body.get("client_id")
         
         # Validate request
         if not current_request:
             raise HTTPException(status_code=400, detail="Missing current_request")
             
-        # Convert message history to conversation format
-        conversation_history = ""
-        if previous_context:
-            for msg in previous_context:
-                prefix = "User: " if msg["role"] == "user" else "Bot: "
-                conversation_history += f"{prefix}{msg['text']}\n"
+        # Server-side session history unless the client sends its own
+        conversation_history = build_conversation_history(client_id, previous_context)
         
+        # Greetings/thanks/farewells are answered before anything is embedded
+        reply = intent_router.template_reply(current_request)
+        if reply is not None:
+            remember_exchange(client_id, current_request, reply)
+            async def reply_generator():
+                yield json.dumps({"chunk": reply}) + "\n"
+            return StreamingResponse(reply_generator(), media_type="application/x-ndjson")
+
+        # Fresh questions (no history) can be answered from the semantic cache
+        query_vector = None
+        if not conversation_history:
+            query_vector = await run_blocking(embed_query, current_request)
+            cached = answer_cache.lookup(query_vector)
+            if cached is not None:
+                remember_exchange(client_id, current_request, cached)
+                async def cached_generator():
+                    for content in answer_cache.replay_chunks(cached):
+                        yield json.dumps({"chunk": content}) + "\n"
+                return StreamingResponse(cached_generator(), media_type="application/x-ndjson")
+        version = answer_cache.current_version()
+
         # Get streaming response
         stream = await rag_pipeline.query_rag_stream(current_request, conversation_history)
         
         # Define a streaming response generator
         async def stream_generator():
             try:
-                for chunk in stream:
-                    if hasattr(chunk.choices[0], 'delta') and chunk.choices[0].delta.content is not None:
-                        content = chunk.choices[0].delta.content
-                        if content:
-                            # Send each chunk as a JSON object with a newline delimiter
-                            yield json.dumps({"chunk": content}) + "\n"
-                            # Add a small delay to prevent overwhelming the client
-                            await asyncio.sleep(0.01)
+                answer = []
+                # Deltas are batched into larger frames (see streaming.py)
+                async for content in coalesce(stream):
+                    answer.append(content)
+                    # Send each chunk as a JSON object with a newline delimiter
+                    yield json.dumps({"chunk": content}) + "\n"
+                # Error fallbacks are shown but never cached or remembered
+                if not rag_pipeline.is_failure(stream):
+                    if query_vector is not None:
+                        answer_cache.store(query_vector, "".join(answer), version)
+                    remember_exchange(client_id, current_request, "".join(answer))
             except Exception as e:
                 print(f"Streaming error: {e}")
                 yield json.dumps({"error": str(e)}) + "\n"
@@ -365,35 +788,57 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                 await websocket.send_json({"error": "Missing current_request"})
                 continue
                 
-            # Convert message history to conversation format
-            conversation_history = ""
-            if previous_context:
-                for msg in previous_context:
-                    prefix = "User: " if msg["role"] == "user" else "Bot: "
-                    conversation_history += f"{prefix}{msg['text']}\n"
+            # Server-side session history unless the client sends its own
+            conversation_history = build_conversation_history(client_id, previous_context)
             
+            # Greetings/thanks/farewells are answered before anything is embedded
+            reply = intent_router.template_reply(current_request)
+            if reply is not None:
+                await websocket.send_json({"chunk": reply})
+                await websocket.send_json({"complete": True})
+                remember_exchange(client_id, current_request, reply)
+                continue
+
+            # Fresh questions (no history) can be answered from the semantic cache
+            query_vector = None
+            if not conversation_history:
+                query_vector = await run_blocking(embed_query, current_request)
+                cached = answer_cache.lookup(query_vector)
+                if cached is not None:
+                    remember_exchange(client_id, current_request, cached)
+                    for content in answer_cache.replay_chunks(cached):
+                        await websocket.send_json({"chunk": content})
+                    await websocket.send_json({"complete": True})
+                    continue
+            version = answer_cache.current_version()
+
             # Get streaming response
             print(f"Getting streaming response for: {current_request}")
             stream = await rag_pipeline2.agentic_ai_with_tools(current_request, conversation_history)
             if type(stream) is str:
+                # Chitchat replies are not worth a semantic cache entry
                 await websocket.send_json({"chunk": stream})
                 await websocket.send_json({"complete": True})
+                remember_exchange(client_id, current_request, stream)
             else:
             # Stream response over WebSocket
                 try:
                     chunks_sent = 0
-                    for chunk in stream:
-                        if hasattr(chunk.choices[0], 'delta') and chunk.choices[0].delta.content is not None:
-                            content = chunk.choices[0].delta.content
-                            if content:
-                                chunks_sent += 1
-                                await websocket.send_json({"chunk": content})
-                                # Small delay to prevent overwhelming the client
-                                await asyncio.sleep(0.01)
+                    answer = []
+                    # Deltas are batched into larger frames (see streaming.py)
+                    async for content in coalesce(stream):
+                        chunks_sent += 1
+                        answer.append(content)
+                        await websocket.send_json({"chunk": content})
                     
                     # Signal completion
                     print(f"Completed streaming response, sent {chunks_sent} chunks")
                     await websocket.send_json({"complete": True})
+                    # Error fallbacks are shown but never cached or remembered
+                    if not rag_pipeline.is_failure(stream):
+                        if query_vector is not None:
+                            answer_cache.store(query_vector, "".join(answer), version)
+                        remember_exchange(client_id, current_request, "".join(answer))
                     
                 except Exception as e:
                     print(f"Streaming error: {e}")
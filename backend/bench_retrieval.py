@@ -0,0 +1,68 @@
+import argparse
+import json
+import random
+import time
+import rag_pipeline
+from context_builder import build_context, estimate_tokens
+from db import db_display
+from embeddings import embed_query
+
+# -------------------------------
+# Recall benchmark: dense top-20 vs hybrid (dense + BM25, RRF)
+# -------------------------------
+# Usage: python bench_retrieval.py [--queries eval.jsonl] [--sample 50]
+# eval.jsonl rows look like {"query": "...", "blog_ids": ["..."]}. Without a
+# file, queries are generated from the corpus: each sampled post's title
+# (relevant: that post) and "blogs by <author>" (relevant: the author's posts).
+
+
+def generated_queries(sample: int):
+    rows = db_display("""
+        SELECT b.id, b.title, u.name
+        FROM blog.blogdetails b
+        JOIN consumer.userdetails u ON b.user_id = u.id
+        WHERE b.delete = 0
+    """, None)
+    by_author = {}
+    for blog_id, _, author in rows:
+        by_author.setdefault(author, set()).add(blog_id)
+    picked = random.sample(rows, min(sample, len(rows)))
+    queries = [{"query": title, "blog_ids": [blog_id]} for blog_id, title, _ in picked]
+    for author in {author for _, _, author in picked}:
+        queries.append({"query": f"blogs by {author}", "blog_ids": sorted(by_author[author])})
+    return queries
+
+
+def recall(matches: list, relevant: list) -> float:
+    found = {m["metadata"].get("blog_id") or m["id"].rpartition("-")[0] for m in matches}
+    return len(found & set(relevant)) / len(relevant)
+
+
+def run(queries: list, top_k: int):
+    totals = {"dense": [0.0, 0, 0.0], "hybrid": [0.0, 0, 0.0]}  # recall, context tokens, seconds
+    for row in queries:
+        vector = embed_query(row["query"])
+        for mode, query_text in (("dense", None), ("hybrid", row["query"])):
+            started = time.perf_counter()
+            matches = rag_pipeline.search(vector, top_k=top_k, query_text=query_text)
+            totals[mode][2] += time.perf_counter() - started
+            totals[mode][0] += recall(matches, row["blog_ids"])
+            totals[mode][1] += estimate_tokens(build_context(matches))
+    n = len(queries)
+    for mode, (rec, tokens, seconds) in totals.items():
+        print(f"{mode:>6}: recall={rec / n:.3f}  context_tokens={tokens / n:.0f}  latency={seconds / n * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare dense-only and hybrid retrieval recall")
+    parser.add_argument("--queries", help="JSONL file of {query, blog_ids}")
+    parser.add_argument("--sample", type=int, default=50, help="posts to sample when generating queries")
+    parser.add_argument("--top-k", type=int, default=20, help="dense-only result count")
+    args = parser.parse_args()
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [json.loads(line) for line in f if line.strip()]
+    else:
+        queries = generated_queries(args.sample)
+    rag_pipeline.rebuild_lexical_index()
+    run(queries, args.top_k)
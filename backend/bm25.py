@@ -0,0 +1,104 @@
+import math
+import re
+import threading
+from collections import Counter
+from vector_store import match_filter
+
+# -------------------------------
+# In-process BM25 index over blog chunks
+# -------------------------------
+# Documents use the same ids as the vector index ('{blog_id}-{i}'), so lexical
+# and dense results can be fused by id.
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "at", "by", "from",
+    "is", "are", "was", "were", "be", "it", "this", "that", "about", "me", "tell", "what",
+    "how", "why", "who", "all", "made", "explain", "blog", "blogs", "post", "posts",
+}
+
+
+def tokenize(text: str) -> list:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self.postings = {}   # term -> {doc_id: tf}
+        self.docs = {}       # doc_id -> (length, metadata)
+        self.total_length = 0
+
+    def add(self, doc_id: str, text: str, metadata: dict | None = None):
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self.remove(doc_id)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            length = sum(counts.values())
+            self.docs[doc_id] = (length, dict(metadata or {}, text=text))
+            self.total_length += length
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            doc = self.docs.pop(doc_id, None)
+            if doc is None:
+                return
+            self.total_length -= doc[0]
+            for term in tokenize(doc[1]["text"]):
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self.postings[term]
+
+    def remove_prefix(self, prefix: str):
+        with self._lock:
+            for doc_id in [d for d in self.docs if d.startswith(prefix)]:
+                self.remove(doc_id)
+
+    def replace_all(self, other: "BM25Index"):
+        """Swap in a freshly built index"""
+        with self._lock:
+            self.postings, self.docs, self.total_length = other.postings, other.docs, other.total_length
+
+    def search(self, query: str, top_k: int = 20, filter: dict | None = None) -> list:
+        """Matches shaped like vector store results: [{"id", "score", "metadata"}]"""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self.docs)
+            if not n or not terms:
+                return []
+            avgdl = self.total_length / n
+            scores = Counter()
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    length = self.docs[doc_id][0]
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avgdl))
+            matches = []
+            for doc_id, score in scores.most_common():
+                metadata = self.docs[doc_id][1]
+                if filter and not match_filter(metadata, filter):
+                    continue
+                matches.append({"id": doc_id, "score": score, "metadata": metadata})
+                if len(matches) >= top_k:
+                    break
+            return matches
+
+    def __len__(self):
+        return len(self.docs)
+
+
+def reciprocal_rank_fusion(*rankings: list, k: int = 60, top_k: int = 10) -> list:
+    """Fuse ranked match lists by sum of 1 / (k + rank); the fused score replaces the original"""
+    fused = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, start=1):
+            entry = fused.setdefault(match["id"], {"id": match["id"], "score": 0.0, "metadata": match["metadata"]})
+            entry["score"] += 1 / (k + rank)
+    return sorted(fused.values(), key=lambda m: m["score"], reverse=True)[:top_k]
@@ -1,7 +1,12 @@
 from langchain_groq import ChatGroq  
 from langchain_core.prompts import ChatPromptTemplate
 import os
+import re
+import math
+import hashlib
+from collections import Counter
 from dotenv import load_dotenv
+from cache import TTLCache
 load_dotenv()
 llm = ChatGroq(
     groq_api_key=os.getenv("GROQ_API_KEY"),
@@ -42,16 +47,129 @@ If the content follows all the rules, respond with:
 
 """)
 
+# -------------------------------
+# Verdict cache and local pre-filter
+# -------------------------------
+# The prompt text is part of the cache key, so editing moderation_prompt
+# automatically invalidates every cached verdict.
+PROMPT_VERSION = hashlib.sha256(moderation_prompt.messages[0].prompt.template.encode("utf-8")).hexdigest()[:12]
+MODERATION_PREFILTER = os.getenv("MODERATION_PREFILTER", "true").lower() == "true"
+verdict_cache = TTLCache(maxsize=int(os.getenv("MODERATION_CACHE_SIZE", "10000")), ttl=float(os.getenv("MODERATION_CACHE_TTL", "86400")))
+stats = {"llm_calls": 0, "cache_hits": 0, "prefilter_rejects": 0}
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "for", "with", "at", "by", "from",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these", "those", "my",
+    "your", "our", "their", "i", "you", "we", "they", "he", "she", "how", "what", "why", "when",
+    "about", "as", "into", "not", "no", "do", "does", "can", "will", "all", "some", "more", "most",
+}
+WORD_RE = re.compile(r"[a-z]+")
+# Short or generic titles ("Thoughts", "Weekend Update") legitimately share no
+# words with their post, so only long specific titles are judged locally
+MISMATCH_MIN_TITLE_KEYWORDS = 4
+MISMATCH_MIN_CONTENT_KEYWORDS = 30
+
+
+def verdict_key(title: str, content: str) -> str:
+    raw = f"{PROMPT_VERSION}\0{title}\0{content}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def char_entropy(text: str) -> float:
+    counts = Counter(text)
+    total = len(text)
+    return -sum(c / total * math.log2(c / total) for c in counts.values())
+
+
+def implausible_word(word: str) -> bool:
+    """Latin-script token that no real word looks like"""
+    if len(word) > 20:
+        return True
+    vowels = sum(ch in "aeiouy" for ch in word)
+    if len(word) >= 6 and vowels / len(word) < 0.15:
+        return True
+    # j/q/x/z are under 1% of English letters; keyboard mashing overuses them
+    rare = sum(ch in "jqxz" for ch in word)
+    if len(word) >= 10 and rare >= 3 and rare / len(word) >= 0.2:
+        return True
+    return re.search(r"[^aeiouy]{6,}", word) is not None
+
+
+def looks_like_gibberish(text: str) -> bool:
+    """Rule: title and content must not be random strings (e.g. "jvohjevjijnvijwnevew")"""
+    stripped = "".join(text.lower().split())
+    if not stripped:
+        return True
+    # Long runs of very few distinct characters ("aaaaaaa", "asdasdasd")
+    if len(stripped) >= 12 and char_entropy(stripped) < 2.0:
+        return True
+    words = WORD_RE.findall(text.lower())
+    # Only judge Latin-script text; other scripts go straight to the LLM
+    if len("".join(words)) < len(stripped) * 0.6:
+        return False
+    long_words = [w for w in words if len(w) >= 4]
+    if not long_words:
+        return False
+    return sum(implausible_word(w) for w in long_words) / len(long_words) > 0.5
+
+
+def keywords(text: str) -> set:
+    # Four-letter prefixes act as a loose stem ("cars"/"car", "hiking"/"hike")
+    return {w[:4] for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS and len(w) > 2}
+
+
+def extreme_mismatch(title: str, content: str) -> bool:
+    """Rule: title and content must be relevant to each other. Only the
+    extreme case is decided locally: a long, multi-word title sharing no
+    keyword with a long post. Everything else goes to the LLM."""
+    title_words = keywords(title)
+    content_words = keywords(content)
+    if len(title_words) < MISMATCH_MIN_TITLE_KEYWORDS or len(content_words) < MISMATCH_MIN_CONTENT_KEYWORDS:
+        return False
+    return not (title_words & content_words)
+
+
+def prefilter_reject(title: str, content: str) -> bool:
+    return looks_like_gibberish(title) or looks_like_gibberish(content) or extreme_mismatch(title, content)
+
+
+def moderation_stats() -> dict:
+    return dict(stats, llm_calls_avoided=stats["cache_hits"] + stats["prefilter_rejects"])
+
+
+def quick_verdict(title: str, content: str) -> bool | None:
+    """Verdict available without the LLM (cached, or a local rejection); None otherwise"""
+    cached = verdict_cache.get(verdict_key(title, content))
+    if cached is not None:
+        stats["cache_hits"] += 1
+        return cached
+
+    # Local rejections are cheap to recompute, so only LLM verdicts are cached
+    if MODERATION_PREFILTER and prefilter_reject(title, content):
+        stats["prefilter_rejects"] += 1
+        return False
+    return None
+
+
 def check_blog_content_langchain(title: str, content: str) -> bool:
+    verdict = quick_verdict(title, content)
+    if verdict is not None:
+        return verdict
+    return llm_verdict(title, content)
+
+
+def llm_verdict(title: str, content: str) -> bool:
+    key = verdict_key(title, content)
     try:
         # Format the prompt with inputs
         prompt = moderation_prompt.format_messages(title=title, content=content)
 
+        stats["llm_calls"] += 1
         response = llm.invoke(prompt)
         
-        return "<result>1</result>" in response.content
+        verdict = "<result>1</result>" in response.content
+        verdict_cache.set(key, verdict)
+        return verdict
     except Exception as e:
         print(f"Error in content moderation: {e}")
-        return False  # Fail closed - reject content on error
-
-
+        return False  # Fail closed - reject content on error (not cached)
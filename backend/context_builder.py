@@ -0,0 +1,119 @@
+import os
+import re
+
+# -------------------------------
+# 1. Settings
+# -------------------------------
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+# MMR trade-off: 1.0 = pure relevance, 0.0 = pure diversity
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+# Segments this similar to one already selected are dropped as near-duplicates
+NEAR_DUPLICATE = float(os.getenv("CONTEXT_NEAR_DUPLICATE", "0.9"))
+MIN_OVERLAP_CHARS = 20
+
+stats = {"queries": 0, "tokens_raw": 0, "tokens_packed": 0}
+WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English BPE vocabularies
+    return len(text) // 4 + 1
+
+
+def split_id(vector_id: str):
+    """'{blog_id}-{i}' -> (blog_id, i); blog ids are uuids, so split on the last dash"""
+    blog_id, _, index = vector_id.rpartition("-")
+    return (blog_id, int(index)) if index.isdigit() else (vector_id, 0)
+
+
+# -------------------------------
+# 2. Merge adjacent chunks
+# -------------------------------
+def strip_overlap(previous: str, following: str) -> str:
+    """Drop the prefix of `following` that repeats the tail of `previous`
+    (chunk_blog uses a 50-token overlap between neighbours)."""
+    probe = following[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return following
+    pos = previous.rfind(probe)
+    while pos != -1:
+        tail = previous[pos:]
+        if following.startswith(tail):
+            return following[len(tail):]
+        pos = previous.rfind(probe, 0, pos)
+    return following
+
+
+def merge_segments(matches: list) -> list:
+    """Group matches by blog and join runs of consecutive chunks into one segment"""
+    by_blog = {}
+    for m in matches:
+        blog_id, index = split_id(m["id"])
+        by_blog.setdefault(blog_id, {})[index] = m
+
+    segments = []
+    for blog_id, chunks in by_blog.items():
+        current = None
+        for index in sorted(chunks):
+            match = chunks[index]
+            text = match["metadata"].get("text", "")
+            if current is not None and index == current["end"] + 1:
+                current["text"] += strip_overlap(current["last"], text)
+                current["score"] = max(current["score"], match["score"])
+            else:
+                current = {"blog_id": blog_id, "text": text, "score": match["score"]}
+                segments.append(current)
+            current["end"] = index
+            current["last"] = text
+    return segments
+
+
+# -------------------------------
+# 3. MMR selection and packing
+# -------------------------------
+def _similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def build_context(matches: list, token_budget: int = CONTEXT_TOKEN_BUDGET, mmr_lambda: float = MMR_LAMBDA) -> str:
+    """Turn raw vector matches into a deduplicated, diversified context that
+    fits `token_budget`."""
+    raw_tokens = estimate_tokens("\n".join(m["metadata"].get("text", "") for m in matches))
+    segments = merge_segments(matches)
+    for segment in segments:
+        segment["words"] = set(WORD_RE.findall(segment["text"].lower()))
+
+    # Scale relevance to [0, 1] so MMR_LAMBDA means the same for cosine and fused (RRF) scores
+    top_score = max((seg["score"] for seg in segments), default=0) or 1
+    for segment in segments:
+        segment["relevance"] = segment["score"] / top_score
+
+    selected, used = [], 0
+    remaining = list(segments)
+    while remaining:
+        def redundancy(segment):
+            return max((_similarity(segment["words"], s["words"]) for s in selected), default=0.0)
+        best = max(remaining, key=lambda s: mmr_lambda * s["relevance"] - (1 - mmr_lambda) * redundancy(s))
+        remaining.remove(best)
+        if redundancy(best) >= NEAR_DUPLICATE:
+            continue
+        cost = estimate_tokens(best["text"])
+        if used + cost > token_budget:
+            # Skip what does not fit but keep trying smaller segments
+            continue
+        selected.append(best)
+        used += cost
+
+    context = "\n\n".join(s["text"] for s in selected)
+    stats["queries"] += 1
+    stats["tokens_raw"] += raw_tokens
+    stats["tokens_packed"] += estimate_tokens(context) if context else 0
+    return context
+
+
+def context_stats() -> dict:
+    saved = stats["tokens_raw"] - stats["tokens_packed"]
+    per_query = saved / stats["queries"] if stats["queries"] else 0
+    return dict(stats, tokens_saved=saved, tokens_saved_per_query=per_query)
@@ -1,55 +1,165 @@
 import psycopg2
+from psycopg2 import pool
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 import os
+import threading
+import time
 
 load_dotenv()
 
-def db_insert(query,value):
-    connection = psycopg2.connect(
-        user=os.getenv("db_username"),
-        password=os.getenv("db_password"),
-        host=os.getenv("db_host"),
-        port=5432,  
-        database="postgres"
-    )                                                                            
-    cursor = connection.cursor()
-    cursor.execute(query,value)
+# -------------------------------
+# 1. Pool settings
+# -------------------------------
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Connections idle for longer than this are pinged before being handed out
+DB_HEALTHCHECK_AFTER = float(os.getenv("DB_HEALTHCHECK_AFTER", "30"))
+# How long a checkout waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
 
-    connection.commit()
-    print("connected")
-    cursor.close()
-    connection.close()
+_pool = None
+_pool_lock = threading.Lock()
+_last_used = {}
+# ThreadedConnectionPool.getconn raises PoolError as soon as DB_POOL_MAX
+# connections are out instead of waiting; callers queue on this first.
+_slots = threading.BoundedSemaphore(DB_POOL_MAX)
 
-def db_display(query,value):
-    connection = psycopg2.connect(
+
+class PoolTimeout(Exception):
+    """No connection became free within DB_POOL_TIMEOUT (app.py maps it to 503)"""
+
+# Connection of the transaction currently open in this context, if any
+_current_conn = ContextVar("current_conn", default=None)
+
+
+def _connect_kwargs():
+    return dict(
         user=os.getenv("db_username"),
         password=os.getenv("db_password"),
         host=os.getenv("db_host"),
-        port=5432,  
+        port=5432,
         database="postgres"
-    )                                                                            
-    cursor = connection.cursor()
-    cursor.execute(query,value)
-    var=cursor.fetchall()
+    )
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **_connect_kwargs())
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _last_used.clear()
+
 
-    connection.commit()
-    print("connected")
-    cursor.close()
-    connection.close()
-    return var
+def _is_healthy(connection):
+    if connection.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(connection), 0) < DB_HEALTHCHECK_AFTER:
+        return True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        connection.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+# -------------------------------
+# 2. Connection checkout
+# -------------------------------
+@contextmanager
+def get_connection():
+    """Borrow a healthy connection from the pool and return it afterwards;
+    waits up to DB_POOL_TIMEOUT for one to be free"""
+    if not _slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise PoolTimeout(f"No database connection free after {DB_POOL_TIMEOUT}s")
+    try:
+        db_pool = get_pool()
+        connection = db_pool.getconn()
+        if not _is_healthy(connection):
+            _last_used.pop(id(connection), None)
+            db_pool.putconn(connection, close=True)
+            connection = db_pool.getconn()
+        broken = False
+        try:
+            yield connection
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if broken or connection.closed:
+                _last_used.pop(id(connection), None)
+                db_pool.putconn(connection, close=True)
+            else:
+                _last_used[id(connection)] = time.monotonic()
+                db_pool.putconn(connection)
+    finally:
+        _slots.release()
+
+
+@contextmanager
+def dedicated_connection(options: str | None = None):
+    """A connection of its own, outside the pool, for long-lived work (exports)
+    that must not hold one of the DB_POOL_MAX shared slots"""
+    kwargs = _connect_kwargs()
+    if options:
+        kwargs["options"] = options
+    connection = psycopg2.connect(**kwargs)
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+@contextmanager
+def transaction():
+    """Unit of work: every db_* call inside the block shares one connection
+    and commits together (or rolls back together on error)."""
+    connection = _current_conn.get()
+    if connection is not None:
+        # Nested block joins the outer transaction
+        yield connection
+        return
+    with get_connection() as connection:
+        token = _current_conn.set(connection)
+        try:
+            yield connection
+            connection.commit()
+        except BaseException:
+            if not connection.closed:
+                connection.rollback()
+            raise
+        finally:
+            _current_conn.reset(token)
+
+
+# -------------------------------
+# 3. Query helpers
+# -------------------------------
+def db_insert(query,value):
+    with transaction() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(query,value)
+
+def db_display(query,value):
+    with transaction() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(query,value)
+            return cursor.fetchall()
 
 def db_update(query,value):
-    connection = psycopg2.connect(
-        user=os.getenv("db_username"),
-        password=os.getenv("db_password"),
-        host=os.getenv("db_host"),
-        port=5432,  
-        database="postgres"
-    )                                                                            
-    cursor = connection.cursor()
-    cursor.execute(query,value)
-
-    connection.commit()
-    print("connected")
-    cursor.close()
-    connection.close()
+    with transaction() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(query,value)
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from cache import TTLCache
+load_dotenv()
+
+# -------------------------------
+# 1. Settings
+# -------------------------------
+EMBED_MODEL = "multilingual-e5-large"  # free via pinecone
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "10000"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(os.path.dirname(__file__), "vector_data", "embeddings.sqlite3"))
+EMBED_BATCH_SIZE = 96  # pinecone inference limit per call
+
+_pc = None
+_memory = TTLCache(maxsize=EMBED_CACHE_SIZE, ttl=float("inf"))
+_disk_lock = threading.Lock()
+_disk = None
+stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "embed_calls": 0}
+
+
+def _client():
+    global _pc
+    if _pc is None:
+        from pinecone import Pinecone
+        _pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    return _pc
+
+
+def _db():
+    global _disk
+    if _disk is None:
+        os.makedirs(os.path.dirname(EMBED_CACHE_PATH), exist_ok=True)
+        _disk = sqlite3.connect(EMBED_CACHE_PATH, check_same_thread=False)
+        _disk.execute("PRAGMA journal_mode=WAL")
+        _disk.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+    return _disk
+
+
+def cache_key(text: str, input_type: str, model: str = EMBED_MODEL) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{input_type}:{digest}"
+
+
+# -------------------------------
+# 2. Cached embedding
+# -------------------------------
+def embed(texts: list, input_type: str, model: str = EMBED_MODEL) -> list:
+    """Embed texts, serving repeats from the in-memory LRU or the SQLite tier
+    and sending only the misses to pc.inference.embed."""
+    keys = [cache_key(t, input_type, model) for t in texts]
+    results = [None] * len(texts)
+
+    missing = []
+    for i, key in enumerate(keys):
+        vector = _memory.get(key)
+        if vector is not None:
+            stats["memory_hits"] += 1
+            results[i] = vector
+        else:
+            missing.append(i)
+
+    if missing:
+        with _disk_lock:
+            db = _db()
+            for i in list(missing):
+                row = db.execute("SELECT vector FROM embeddings WHERE key = ?", (keys[i],)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32).tolist()
+                    _memory.set(keys[i], vector)
+                    results[i] = vector
+                    stats["disk_hits"] += 1
+                    missing.remove(i)
+
+    # Identical texts within one call are embedded once
+    unique = {}
+    for i in missing:
+        unique.setdefault(keys[i], []).append(i)
+    pending = list(unique.items())
+    for start in range(0, len(pending), EMBED_BATCH_SIZE):
+        batch = pending[start:start + EMBED_BATCH_SIZE]
+        response = _client().inference.embed(
+            model=model,
+            inputs=[texts[positions[0]] for _, positions in batch],
+            parameters={"input_type": input_type}
+        )
+        stats["embed_calls"] += 1
+        rows = []
+        for (key, positions), emb in zip(batch, response.data):
+            vector = list(emb.values)
+            stats["misses"] += len(positions)
+            _memory.set(key, vector)
+            rows.append((key, np.asarray(vector, dtype=np.float32).tobytes()))
+            for i in positions:
+                results[i] = vector
+        with _disk_lock:
+            db = _db()
+            db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            db.commit()
+
+    return results
+
+
+def embed_passages(texts: list) -> list:
+    return embed(texts, "passage")
+
+
+def embed_query(text: str) -> list:
+    return embed([text], "query")[0]
+
+
+def cache_stats() -> dict:
+    return dict(stats, memory_size=len(_memory))
@@ -0,0 +1,186 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+from db import db_display
+import response_cache
+
+# -------------------------------
+# 1. Settings
+# -------------------------------
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+# Variant name -> max width in px; feed cards are ~400px wide, the post page ~1280px
+IMAGE_VARIANTS = {"thumb": 480, "large": 1280}
+# Refuse to decode anything bigger (decompression bombs)
+Image.MAX_IMAGE_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "40000000"))
+
+MEDIA_ROOT = os.path.join(os.path.dirname(__file__), "media")
+IMAGES_DIR = os.path.join(MEDIA_ROOT, "images")
+UPLOAD_PREFIX = "/media/uploads/"
+SAVE_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".gif": "GIF", ".webp": "WEBP"}
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+
+
+# -------------------------------
+# 2. Content-addressed storage
+# -------------------------------
+# media/images/ab/abcdef.../original.jpg, thumb.webp, large.webp, manifest.json
+# The directory is named by the sha256 of the uploaded bytes, so identical
+# uploads are processed and stored once and the files never change.
+def media_path(url: str) -> str:
+    return os.path.join(MEDIA_ROOT, url.removeprefix("/media/"))
+
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _url(digest: str, filename: str) -> str:
+    return f"/media/images/{digest[:2]}/{digest}/{filename}"
+
+
+def _save_clean(image: Image.Image, path: str, fmt: str):
+    """Re-encode without passing EXIF/XMP/text chunks through (drops GPS, camera serials, ...)"""
+    options = {}
+    if fmt == "JPEG":
+        image = image.convert("RGB")
+        options = {"quality": 90, "optimize": True}
+    elif fmt == "PNG":
+        options = {"optimize": True}
+    elif fmt == "WEBP":
+        options = {"quality": IMAGE_WEBP_QUALITY}
+    image.save(path, fmt, **options)
+
+
+def _write_files(source: str, tmp: str, digest: str, ext: str) -> dict:
+    with Image.open(source) as image:
+        fmt = SAVE_FORMATS.get(ext, image.format)
+        manifest = {"width": image.width, "height": image.height}
+        if getattr(image, "is_animated", False):
+            # Re-encoding would drop frames; keep the upload as-is
+            shutil.copyfile(source, os.path.join(tmp, f"original{ext}"))
+        else:
+            # Apply the EXIF orientation before the EXIF block is dropped
+            image = ImageOps.exif_transpose(image)
+            manifest["width"], manifest["height"] = image.size
+            _save_clean(image, os.path.join(tmp, f"original{ext}"), fmt)
+            for name, max_width in IMAGE_VARIANTS.items():
+                variant = image.copy()
+                if variant.mode not in ("RGB", "RGBA"):
+                    variant = variant.convert("RGBA" if "transparency" in variant.info or variant.mode == "LA" else "RGB")
+                variant.thumbnail((max_width, max_width * 4))
+                _save_clean(variant, os.path.join(tmp, f"{name}.webp"), "WEBP")
+                manifest[name] = _url(digest, f"{name}.webp")
+    return manifest
+
+
+def build_variants(source: str, digest: str, ext: str) -> dict:
+    """Write the stripped original plus WebP variants and return the manifest"""
+    target = os.path.join(IMAGES_DIR, digest[:2], digest)
+    manifest_file = os.path.join(target, "manifest.json")
+    if os.path.exists(manifest_file):
+        # Same bytes were uploaded before
+        with open(manifest_file) as f:
+            return json.load(f)
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f"{digest}.", suffix=".tmp", dir=os.path.dirname(target))
+    os.chmod(tmp, 0o755)
+    try:
+        manifest = _write_files(source, tmp, digest, ext)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    manifest["original"] = _url(digest, f"original{ext}")
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Another worker finished the same content first
+        shutil.rmtree(tmp, ignore_errors=True)
+        with open(manifest_file) as f:
+            return json.load(f)
+    return manifest
+
+
+# -------------------------------
+# 3. Processing
+# -------------------------------
+def process_blog_image(blog_id: str, upload_url: str):
+    """Replace a raw upload with its content-addressed original and variants"""
+    source = media_path(upload_url)
+    if not os.path.exists(source):
+        return
+    ext = os.path.splitext(source)[1].lower()
+    manifest = build_variants(source, content_hash(source), ext)
+    query = """
+        UPDATE blog.blogdetails SET image_url = %s, image_variants = %s
+        WHERE id = %s AND image_url = %s
+        RETURNING user_id
+    """
+    updated = db_display(query, (manifest["original"], json.dumps(manifest), blog_id, upload_url))
+    if updated:
+        os.remove(source)
+        response_cache.invalidate(
+            response_cache.feed_group(),
+            response_cache.blog_group(blog_id),
+            response_cache.user_group(updated[0][0]),
+        )
+    print(f"Image for blog {blog_id} processed: {manifest['original']}")
+
+
+def _run(blog_id: str, upload_url: str):
+    try:
+        process_blog_image(blog_id, upload_url)
+    except Exception as e:
+        # The raw upload stays in place and keeps being served
+        print(f"Image processing failed for {blog_id}: {e}")
+
+
+def submit(blog_id: str, upload_url: str):
+    """Queue processing after the blog row is committed"""
+    _executor.submit(_run, blog_id, upload_url)
+
+
+def pending_uploads():
+    query = """
+        SELECT id, image_url FROM blog.blogdetails
+        WHERE "delete" = 0 AND image_variants IS NULL AND image_url LIKE %s
+    """
+    return db_display(query, (UPLOAD_PREFIX + "%",))
+
+
+def resume_pending():
+    """Queue uploads left unprocessed by a restart (or from before this pipeline)"""
+    def queue_all():
+        try:
+            for blog_id, upload_url in pending_uploads():
+                submit(blog_id, upload_url)
+        except Exception as e:
+            print(f"Could not list pending images: {e}")
+    _executor.submit(queue_all)
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process raw blog image uploads into variants")
+    parser.add_argument("command", choices=["backfill"])
+    args = parser.parse_args()
+    rows = pending_uploads()
+    for blog_id, upload_url in rows:
+        _run(blog_id, upload_url)
+    print(f"Processed {len(rows)} images")
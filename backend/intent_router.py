@@ -0,0 +1,200 @@
+import json
+import math
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+# -------------------------------
+# 1. Settings
+# -------------------------------
+DATA_DIR = os.path.join(os.path.dirname(__file__), "vector_data")
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH", os.path.join(DATA_DIR, "intent_log.jsonl"))
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", os.path.join(DATA_DIR, "intent_model.json"))
+# Classifier verdicts below this posterior go to the LLM
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.9"))
+
+CHITCHAT = "chitchat"
+KNOWLEDGE = "knowledge"
+AMBIGUOUS = "ambiguous"
+
+stats = {"rules": 0, "model": 0, "llm": 0}
+_log_lock = threading.Lock()
+
+
+@dataclass
+class Route:
+    intent: str
+    reply: str | None = None
+    source: str = "rules"
+
+
+# -------------------------------
+# 2. Rules and templates
+# -------------------------------
+TEMPLATES = [
+    (re.compile(r"^(hi+|hello+|hey+|hiya|yo|good (morning|afternoon|evening)|greetings)( there)?( bloggy)?[\s!.,👋]*$"),
+     "Hi! Welcome to Bloggy 👋 Ask me about anything from the blogs here."),
+    (re.compile(r"^(thanks?( you)?( so much| a lot)?|thank u|thx|ty|cheers|great,? thanks?)( bloggy)?[\s!.,]*$"),
+     "You're welcome!"),
+    (re.compile(r"^(bye+|goodbye|good bye|see (you|ya)( later)?|cya|take care)( bloggy)?[\s!.,]*$"),
+     "Goodbye! Come back any time."),
+    (re.compile(r"^(how are you( doing)?|how's it going|what's up|sup)\??[\s!.,]*$"),
+     "I'm doing great, thanks for asking! What would you like to read about?"),
+]
+
+KNOWLEDGE_RE = re.compile(
+    r"^(what|who|which|where|when|why|how|explain|describe|summari[sz]e|list|tell me|show me|give me|find|compare)\b"
+    r"|\b(blogs?|posts?|articles?|written|wrote)\b"
+)
+# Questions about the bot itself ("who are you?", "what do you know") or asks
+# for entertainment are never clear knowledge queries: the LLM's chitchat
+# mode and "what do you know" rule answer them
+CONVERSATIONAL_RE = re.compile(r"\b(you|your|yours|yourself|u|ur|bloggy|joke|jokes|riddle|story)\b")
+# Follow-ups that lean on earlier turns need the LLM to rewrite the question
+ANAPHORA_RE = re.compile(r"\b(it|its|that|this|these|those|they|them|he|she|his|her|more|above|previous|same)\b")
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def tokens(text: str) -> list:
+    words = TOKEN_RE.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+# -------------------------------
+# 3. Naive Bayes classifier trained from logged traffic
+# -------------------------------
+class IntentModel:
+    def __init__(self, labels: dict, vocab_size: int):
+        self.labels = labels  # label -> {"docs", "total", "counts"}
+        self.vocab_size = vocab_size
+        self.doc_total = sum(l["docs"] for l in labels.values())
+
+    @classmethod
+    def train(cls, examples: list):
+        labels = {}
+        vocab = set()
+        for text, label in examples:
+            entry = labels.setdefault(label, {"docs": 0, "total": 0, "counts": Counter()})
+            toks = tokens(text)
+            entry["docs"] += 1
+            entry["total"] += len(toks)
+            entry["counts"].update(toks)
+            vocab.update(toks)
+        return cls(labels, len(vocab))
+
+    def predict(self, text: str):
+        """Return (label, posterior) with add-one smoothing"""
+        toks = tokens(text)
+        scores = {}
+        for label, entry in self.labels.items():
+            score = math.log(entry["docs"] / self.doc_total)
+            denom = entry["total"] + self.vocab_size
+            for tok in toks:
+                score += math.log((entry["counts"].get(tok, 0) + 1) / denom)
+            scores[label] = score
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1 / norm
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"vocab_size": self.vocab_size, "labels": {
+                label: {"docs": e["docs"], "total": e["total"], "counts": dict(e["counts"])}
+                for label, e in self.labels.items()
+            }}, f)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["labels"], data["vocab_size"])
+
+
+def _load_model():
+    if not os.path.exists(INTENT_MODEL_PATH):
+        return None
+    try:
+        model = IntentModel.load(INTENT_MODEL_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not load intent model: {e}")
+        return None
+    # A one-class model cannot tell anything apart
+    return model if len(model.labels) > 1 else None
+
+model = _load_model()
+
+
+# -------------------------------
+# 4. Routing
+# -------------------------------
+def template_reply(user_query: str) -> str | None:
+    """Canned reply for greetings, thanks and farewells; None for anything else"""
+    text = normalize(user_query)
+    for pattern, reply in TEMPLATES:
+        if pattern.match(text):
+            stats["rules"] += 1
+            return reply
+    return None
+
+
+def route(user_query: str, conversation_history: str = "") -> Route:
+    reply = template_reply(user_query)
+    if reply is not None:
+        return Route(CHITCHAT, reply)
+
+    text = normalize(user_query)
+
+    follow_up = bool(conversation_history) and ANAPHORA_RE.search(text) is not None
+    conversational = CONVERSATIONAL_RE.search(text) is not None
+    if not follow_up and not conversational and KNOWLEDGE_RE.search(text) and len(text.split()) >= 3:
+        stats["rules"] += 1
+        return Route(KNOWLEDGE)
+
+    if model is not None and not follow_up and not conversational:
+        label, confidence = model.predict(text)
+        # Only knowledge is routed by the model: chitchat replies need the LLM to write them
+        if label == KNOWLEDGE and confidence >= INTENT_MIN_CONFIDENCE:
+            stats["model"] += 1
+            return Route(KNOWLEDGE, source="model")
+
+    stats["llm"] += 1
+    return Route(AMBIGUOUS, source="llm")
+
+
+def log_decision(user_query: str, intent: str):
+    """Record the LLM classifier's verdict as a training example"""
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(INTENT_LOG_PATH), exist_ok=True)
+            with open(INTENT_LOG_PATH, "a") as f:
+                f.write(json.dumps({"text": normalize(user_query), "label": intent}) + "\n")
+    except OSError as e:
+        print(f"Could not log intent: {e}")
+
+
+def train(log_path: str = INTENT_LOG_PATH, model_path: str = INTENT_MODEL_PATH):
+    examples = []
+    with open(log_path) as f:
+        for line in f:
+            row = json.loads(line)
+            examples.append((row["text"], row["label"]))
+    trained = IntentModel.train(examples)
+    trained.save(model_path)
+    print(f"Trained intent model on {len(examples)} examples: "
+          + ", ".join(f"{label}={e['docs']}" for label, e in trained.labels.items()))
+
+
+if __name__ == "__main__":
+    # Usage: python intent_router.py train
+    if sys.argv[1:] == ["train"]:
+        train()
+    else:
+        print("Usage: python intent_router.py train")
@@ -0,0 +1,145 @@
+import os
+import threading
+import rag_pipeline
+from db import db_display, db_update
+
+# -------------------------------
+# 1. Settings
+# -------------------------------
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", "2"))
+INDEX_MAX_ATTEMPTS = int(os.getenv("INDEX_MAX_ATTEMPTS", "5"))
+INDEX_BACKOFF_SECONDS = float(os.getenv("INDEX_BACKOFF_SECONDS", "5"))
+INDEX_POLL_SECONDS = float(os.getenv("INDEX_POLL_SECONDS", "2"))
+# A 'running' job not touched for this long belongs to a dead worker and is retried
+INDEX_LEASE_SECONDS = int(os.getenv("INDEX_LEASE_SECONDS", "300"))
+
+_stop = threading.Event()
+_wakeup = threading.Event()
+_workers = []
+
+
+# -------------------------------
+# 2. Queue operations
+# -------------------------------
+def enqueue_index_job(blog_id: str):
+    """Queue (or re-queue) indexing for a blog. Call inside the same
+    transaction() as the blog insert so the job exists iff the row does."""
+    query = """
+        INSERT INTO blog.index_jobs (blog_id) VALUES (%s)
+        ON CONFLICT (blog_id) DO UPDATE
+            SET status = 'pending', attempts = 0, last_error = NULL,
+                run_after = now(), updated_at = now()
+    """
+    db_update(query, (blog_id,))
+    _wakeup.set()
+
+
+def claim_job():
+    """Atomically take the next due job; SKIP LOCKED lets workers run in parallel"""
+    query = """
+        UPDATE blog.index_jobs
+        SET status = 'running', attempts = attempts + 1, updated_at = now()
+        WHERE blog_id = (
+            SELECT blog_id FROM blog.index_jobs
+            WHERE (status = 'pending' AND run_after <= now())
+               OR (status = 'running' AND updated_at < now() - make_interval(secs => %s))
+            ORDER BY run_after
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING blog_id, attempts
+    """
+    rows = db_display(query, (INDEX_LEASE_SECONDS,))
+    return rows[0] if rows else None
+
+
+def complete_job(blog_id: str):
+    db_update("UPDATE blog.index_jobs SET status = 'done', last_error = NULL, updated_at = now() WHERE blog_id = %s", (blog_id,))
+
+
+def fail_job(blog_id: str, attempts: int, error: str):
+    if attempts >= INDEX_MAX_ATTEMPTS:
+        query = "UPDATE blog.index_jobs SET status = 'failed', last_error = %s, updated_at = now() WHERE blog_id = %s"
+        db_update(query, (error, blog_id))
+        return
+    delay = INDEX_BACKOFF_SECONDS * (2 ** (attempts - 1))
+    query = """
+        UPDATE blog.index_jobs
+        SET status = 'pending', last_error = %s, updated_at = now(),
+            run_after = now() + make_interval(secs => %s)
+        WHERE blog_id = %s
+    """
+    db_update(query, (error, delay, blog_id))
+
+
+def get_job(blog_id: str):
+    query = "SELECT blog_id, status, attempts, last_error, updated_at FROM blog.index_jobs WHERE blog_id = %s"
+    rows = db_display(query, (blog_id,))
+    if not rows:
+        return None
+    blog_id, status, attempts, last_error, updated_at = rows[0]
+    return {"blog_id": blog_id, "status": status, "attempts": attempts, "last_error": last_error, "updated_at": updated_at}
+
+
+# -------------------------------
+# 3. Job execution
+# -------------------------------
+def run_index_job(blog_id: str):
+    query = """
+        SELECT b.title, b.content, u.name, b.user_id, b.createdat
+        FROM blog.blogdetails b
+        JOIN consumer.userdetails u ON b.user_id = u.id
+        WHERE b.id = %s AND b.delete = 0
+    """
+    rows = db_display(query, (blog_id,))
+    if not rows:
+        # Deleted (or never committed) - nothing to index
+        return
+    title, content, username, user_id, createdat = rows[0]
+    rag_pipeline.add_blog_to_pinecone(
+        blog_id,
+        rag_pipeline.format_blog_text(title, username, content),
+        rag_pipeline.blog_metadata(user_id, username, createdat),
+    )
+
+
+def process_one():
+    """Claim and run one job; returns False when the queue is empty"""
+    job = claim_job()
+    if job is None:
+        return False
+    blog_id, attempts = job
+    try:
+        run_index_job(blog_id)
+        complete_job(blog_id)
+    except Exception as e:
+        print(f"Index job {blog_id} failed (attempt {attempts}): {e}")
+        fail_job(blog_id, attempts, str(e))
+    return True
+
+
+def _worker_loop():
+    while not _stop.is_set():
+        try:
+            if process_one():
+                continue
+        except Exception as e:
+            print(f"Index worker error: {e}")
+        _wakeup.wait(INDEX_POLL_SECONDS)
+        _wakeup.clear()
+
+
+def start_workers(count: int = INDEX_WORKERS):
+    _stop.clear()
+    for i in range(count):
+        worker = threading.Thread(target=_worker_loop, name=f"index-worker-{i}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+
+def stop_workers(timeout: float = 10):
+    _stop.set()
+    _wakeup.set()
+    for worker in _workers:
+        worker.join(timeout)
+    _workers.clear()
@@ -0,0 +1,39 @@
+import os
+from db import get_connection
+
+# -------------------------------
+# Apply SQL migrations in filename order
+# -------------------------------
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+
+def migrate():
+    """Run every migrations/*.sql file not yet recorded in public.schema_migrations.
+
+    Files run in autocommit mode so they may use CREATE INDEX CONCURRENTLY
+    (keep such a statement alone in its file).
+    """
+    with get_connection() as connection:
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TABLE IF NOT EXISTS public.schema_migrations "
+                    "(name text PRIMARY KEY, applied_at timestamptz NOT NULL DEFAULT now())"
+                )
+                cursor.execute("SELECT name FROM public.schema_migrations")
+                applied = {row[0] for row in cursor.fetchall()}
+
+                for name in sorted(os.listdir(MIGRATIONS_DIR)):
+                    if not name.endswith(".sql") or name in applied:
+                        continue
+                    with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+                        cursor.execute(f.read())
+                    cursor.execute("INSERT INTO public.schema_migrations (name) VALUES (%s)", (name,))
+                    print(f"Applied migration {name}")
+        finally:
+            connection.autocommit = False
+
+
+if __name__ == "__main__":
+    migrate()
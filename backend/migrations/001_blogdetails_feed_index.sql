@@ -0,0 +1,5 @@
+-- Feed order for /getblogs keyset pagination: newest first, id as tie-breaker.
+-- Partial so soft-deleted posts never take up index space.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS blogdetails_feed_idx
+    ON blog.blogdetails (createdat DESC, "time" DESC, id DESC)
+    WHERE "delete" = 0;
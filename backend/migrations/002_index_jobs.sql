@@ -0,0 +1,15 @@
+-- Durable queue of vector-indexing work for /addblog.
+-- One row per blog: re-enqueueing the same blog_id resets the existing job.
+CREATE TABLE IF NOT EXISTS blog.index_jobs (
+    blog_id     text PRIMARY KEY,
+    status      text NOT NULL DEFAULT 'pending',  -- pending | running | done | failed
+    attempts    integer NOT NULL DEFAULT 0,
+    last_error  text,
+    run_after   timestamptz NOT NULL DEFAULT now(),
+    created_at  timestamptz NOT NULL DEFAULT now(),
+    updated_at  timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS index_jobs_pending_idx
+    ON blog.index_jobs (run_after)
+    WHERE status IN ('pending', 'running');
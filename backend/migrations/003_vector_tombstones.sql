@@ -0,0 +1,11 @@
+-- Blogs soft-deleted in blog.blogdetails whose vectors still need purging.
+-- Rows stay after the purge (purged_at set) as an audit trail.
+CREATE TABLE IF NOT EXISTS blog.vector_tombstones (
+    blog_id     text PRIMARY KEY,
+    deleted_at  timestamptz NOT NULL DEFAULT now(),
+    purged_at   timestamptz
+);
+
+CREATE INDEX IF NOT EXISTS vector_tombstones_pending_idx
+    ON blog.vector_tombstones (deleted_at)
+    WHERE purged_at IS NULL;
@@ -0,0 +1,7 @@
+-- Full-text search document for /search: title weighted above content.
+ALTER TABLE blog.blogdetails
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED;
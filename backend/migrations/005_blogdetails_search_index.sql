@@ -0,0 +1,4 @@
+-- GIN index over live posts for /search.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS blogdetails_search_idx
+    ON blog.blogdetails USING GIN (search_vector)
+    WHERE "delete" = 0;
@@ -0,0 +1,16 @@
+-- Precomputed preview for feed cards so list endpoints don't ship full posts.
+-- New rows get it from app.make_excerpt on insert; this backfills existing ones
+-- with the same rule (whitespace collapsed, cut on a word boundary).
+ALTER TABLE blog.blogdetails ADD COLUMN IF NOT EXISTS excerpt text;
+
+UPDATE blog.blogdetails
+SET excerpt = CASE
+    WHEN length(c.text) <= 280 THEN c.text
+    ELSE left(regexp_replace(left(c.text, 281), '\s+\S*$', ''), 280) || '…'
+END
+FROM (
+    SELECT id, btrim(regexp_replace(coalesce(content, ''), '\s+', ' ', 'g')) AS text
+    FROM blog.blogdetails
+    WHERE excerpt IS NULL
+) c
+WHERE blog.blogdetails.id = c.id;
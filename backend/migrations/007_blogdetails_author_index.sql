@@ -0,0 +1,4 @@
+-- Per-author order for /myblogs keyset pagination and /myblogs/export.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS blogdetails_author_idx
+    ON blog.blogdetails (user_id, createdat DESC, "time" DESC, id DESC)
+    WHERE "delete" = 0;
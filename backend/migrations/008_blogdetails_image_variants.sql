@@ -0,0 +1,3 @@
+-- Manifest of processed image files (original, thumb, large, width, height) written
+-- by images.py; NULL while the raw upload is still waiting to be processed.
+ALTER TABLE blog.blogdetails ADD COLUMN IF NOT EXISTS image_variants jsonb;
@@ -0,0 +1,21 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------------
+# Bounded thread offload for blocking calls made from async code
+# -------------------------------
+# Sync SDK calls (embedding, vector queries, DB) run here instead of on the
+# event loop; the pool size caps how many run at once.
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "32"))
+_executor = ThreadPoolExecutor(max_workers=OFFLOAD_WORKERS, thread_name_prefix="offload")
+
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
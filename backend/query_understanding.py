@@ -0,0 +1,138 @@
+import calendar
+import datetime
+import re
+import time
+import threading
+from collections import Counter
+from dataclasses import dataclass
+import pytz
+from db import db_display
+
+# -------------------------------
+# Extract author and date scope from a chatbot question
+# -------------------------------
+# "explain all the blogs made by abhi" -> filter {"author": "abhi kumar"}
+# "what did sam post last month"        -> filter {"createdat": {"$gte": ..., "$lte": ...}}
+# createdat in vector metadata is an int YYYYMMDD so it supports range filters.
+AUTHORS_REFRESH_SECONDS = 300
+IST = pytz.timezone('Asia/Kolkata')
+
+# "by X" alone is often not about authorship ("sorted by date"), so it only
+# counts with a full name; "written by X", "posts by X" and "X's posts" may
+# also use a unique first name
+AUTHOR_RE = re.compile(
+    r"\b((?:written|made|posted|authored|published|blogs?|posts?|articles?)\s+)?by\s+@?([\w.\- ]{2,60})", re.I
+)
+POSSESSIVE_RE = re.compile(r"\b([\w.\-]{2,30}(?: [\w.\-]{2,30})?)'s\s+(?:blogs?|posts?|articles?|writing)", re.I)
+YEAR_RE = re.compile(r"\b(?:in|from|during)\s+(20\d\d)\b", re.I)
+MONTH_RE = re.compile(r"\b(?:in|from|during)\s+(" + "|".join(m.lower() for m in calendar.month_name[1:]) + r")(?:\s+(20\d\d))?\b", re.I)
+
+_authors = {}
+_authors_loaded = 0.0
+_lock = threading.Lock()
+
+
+@dataclass
+class QueryScope:
+    author: str | None = None
+    date_from: int | None = None
+    date_to: int | None = None
+
+    @property
+    def filter(self) -> dict | None:
+        clauses = []
+        if self.author:
+            clauses.append({"author": self.author})
+        if self.date_from is not None or self.date_to is not None:
+            bounds = {}
+            if self.date_from is not None:
+                bounds["$gte"] = self.date_from
+            if self.date_to is not None:
+                bounds["$lte"] = self.date_to
+            clauses.append({"createdat": bounds})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def date_key(day: datetime.date) -> int:
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def known_authors() -> dict:
+    """lowercased name (and unique first name) -> lowercased full name of authors with live posts"""
+    global _authors, _authors_loaded
+    if time.monotonic() - _authors_loaded > AUTHORS_REFRESH_SECONDS:
+        rows = db_display("""
+            SELECT DISTINCT lower(u.name)
+            FROM consumer.userdetails u
+            JOIN blog.blogdetails b ON b.user_id = u.id
+            WHERE b.delete = 0
+        """, None)
+        names = {row[0] for row in rows if row[0] and row[0].strip()}
+        first_names = Counter(name.split()[0] for name in names)
+        authors = {name.split()[0]: name for name in names if first_names[name.split()[0]] == 1}
+        authors.update({name: name for name in names})
+        with _lock:
+            _authors, _authors_loaded = authors, time.monotonic()
+    return _authors
+
+
+def extract_author(question: str) -> str | None:
+    authors = known_authors()
+    # (phrase, explicitly about authorship)
+    candidates = [(m.group(2), m.group(1) is not None) for m in AUTHOR_RE.finditer(question)]
+    candidates += [(m.group(1), True) for m in POSSESSIVE_RE.finditer(question)]
+    for phrase, explicit in candidates:
+        words = phrase.lower().strip(" .?!").split()
+        # Longest known name at the start of the phrase wins ("abhi kumar" over "abhi")
+        for n in range(min(len(words), 4), 0, -1):
+            name = " ".join(words[:n])
+            if name in authors and (explicit or authors[name] == name):
+                return authors[name]
+    return None
+
+
+def extract_dates(question: str, today: datetime.date | None = None):
+    today = today or datetime.datetime.now(IST).date()
+    text = question.lower()
+    if "today" in text:
+        return date_key(today), date_key(today)
+    if "yesterday" in text:
+        day = today - datetime.timedelta(days=1)
+        return date_key(day), date_key(day)
+    if "this week" in text:
+        return date_key(today - datetime.timedelta(days=today.weekday())), date_key(today)
+    if "last week" in text:
+        start = today - datetime.timedelta(days=today.weekday() + 7)
+        return date_key(start), date_key(start + datetime.timedelta(days=6))
+    if "this month" in text:
+        return date_key(today.replace(day=1)), date_key(today)
+    if "last month" in text:
+        end = today.replace(day=1) - datetime.timedelta(days=1)
+        return date_key(end.replace(day=1)), date_key(end)
+    if "this year" in text:
+        return date_key(today.replace(month=1, day=1)), date_key(today)
+    if "last year" in text:
+        return (today.year - 1) * 10000 + 101, (today.year - 1) * 10000 + 1231
+    match = MONTH_RE.search(question)
+    if match:
+        month = [m.lower() for m in calendar.month_name].index(match.group(1).lower())
+        year = int(match.group(2)) if match.group(2) else today.year
+        last = calendar.monthrange(year, month)[1]
+        return year * 10000 + month * 100 + 1, year * 10000 + month * 100 + last
+    match = YEAR_RE.search(question)
+    if match:
+        year = int(match.group(1))
+        return year * 10000 + 101, year * 10000 + 1231
+    return None, None
+
+
+def understand(question: str) -> QueryScope:
+    try:
+        author = extract_author(question)
+    except Exception as e:
+        print(f"Author lookup failed: {e}")
+        author = None
+    date_from, date_to = extract_dates(question)
+    return QueryScope(author=author, date_from=date_from, date_to=date_to)
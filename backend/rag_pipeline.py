@@ -1,7 +1,20 @@
 from langchain_text_splitters import TokenTextSplitter
-from pinecone import Pinecone, ServerlessSpec
-from groq import Groq
+from groq import Groq, AsyncGroq
+from types import SimpleNamespace
+from offload import run_blocking
+from vector_store import get_vector_store
+from embeddings import embed_passages, embed_query, EMBED_BATCH_SIZE
+import answer_cache
+import vector_lifecycle
+from bm25 import BM25Index, reciprocal_rank_fusion
+from db import db_display
+from context_builder import build_context
+import query_understanding
 import os
+import datetime
+import hashlib
+import threading
+import time
 from dotenv import load_dotenv
 load_dotenv()
 # -------------------------------
@@ -9,63 +22,174 @@ load_dotenv()
 # -------------------------------
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+async_client = AsyncGroq(api_key=GROQ_API_KEY)
 
 # -------------------------------
-# 2. Init Pinecone
+# 2. Init vector store
 # -------------------------------
-pc = Pinecone(api_key=PINECONE_API_KEY)
+# Vector store backend (Pinecone or in-process NumPy, see vector_store.py)
+store = get_vector_store()
 
-index_name = "rag-blogs"
-
-# Create index if not exists
-if index_name not in [i["name"] for i in pc.list_indexes()]:
-    pc.create_index(
-        name=index_name,
-        dimension=1024,  
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-east-1")
-    )
-
-index = pc.Index(index_name)
+# Lexical side of hybrid retrieval, mirrors the vector index chunk ids
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+HYBRID_TOP_K = int(os.getenv("HYBRID_TOP_K", "10"))
+BM25_REFRESH_SECONDS = float(os.getenv("BM25_REFRESH_SECONDS", "600"))
+lexical_index = BM25Index()
 
 # -------------------------------
 # 3. Chunk blog into tokens
 # -------------------------------
+# Built once: constructing the splitter loads the tokenizer
+token_splitter = TokenTextSplitter(
+    chunk_size=500,     # max tokens per chunk
+    chunk_overlap=50    # overlap
+)
+
 def chunk_blog(blog_text: str):
-    token_splitter = TokenTextSplitter(
-        chunk_size=500,     # max tokens per chunk
-        chunk_overlap=50    # overlap
-    )
     return token_splitter.split_text(blog_text)
 
 # -------------------------------
 # 4. Add blog to Pinecone
 # -------------------------------
-def add_blog_to_pinecone(blog_id: str, blog_text: str):
-    chunks = chunk_blog(blog_text)
-
-    
-    embed_model = "multilingual-e5-large"  # free via pinecone
-    embeddings = pc.inference.embed(
-        model=embed_model,
-        inputs=chunks,
-        parameters={"input_type": "passage"}
-    )
-
+def format_blog_text(title: str, username: str, content: str):
+    return f"{title}\nby {username}\n{content}"
+
+def chunk_hash(chunk: str):
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:16]
+
+def blog_metadata(user_id: str, username: str, createdat):
+    """Filterable metadata stored on every chunk: author is lowercased and
+    createdat is an int YYYYMMDD so both work with query_understanding scopes"""
+    if isinstance(createdat, str):
+        createdat = datetime.date.fromisoformat(createdat[:10])
+    return {
+        "user_id": str(user_id),
+        "author": (username or "").lower(),
+        "createdat": query_understanding.date_key(createdat),
+    }
+
+def build_vectors(blog_id: str, chunks: list, embeddings: list, indexes: list | None = None, metadata: dict | None = None):
+    """Vectors for chunks[i] (all of them, or only `indexes`) with matching embeddings"""
     vectors = []
-    for i, emb in enumerate(embeddings.data):
+    for i, values in zip(indexes if indexes is not None else range(len(chunks)), embeddings):
         vectors.append({
             "id": f"{blog_id}-{i}",
-            "values": emb.values,
-            "metadata": {"text": chunks[i]}
+            "values": values,
+            "metadata": dict(metadata or {}, text=chunks[i], hash=chunk_hash(chunks[i]), blog_id=blog_id)
         })
+    return vectors
 
-    index.upsert(vectors=vectors)
-    print(f"✅ Blog {blog_id} added with {len(vectors)} chunks")
+def embed_blog(blog_text: str, stop: threading.Event | None = None):
+    """Chunk and embed a blog; `stop` is checked before each embedding call,
+    since cancelling the awaiting task does not stop the offload thread"""
+    chunks = chunk_blog(blog_text)
+    embeddings = []
+    for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+        if stop is not None and stop.is_set():
+            return None
+        embeddings.extend(embed_passages(chunks[start:start + EMBED_BATCH_SIZE]))
+    return chunks, embeddings
+
+def add_blog_to_pinecone(blog_id: str, blog_text: str, metadata: dict | None = None):
+    """Index a blog, re-embedding only chunks whose content hash changed and
+    deleting chunk ids the new version no longer has.
+
+    `metadata` (see blog_metadata) is stored on every chunk; chunks whose
+    text is unchanged but whose metadata differs are re-upserted as well.
+    """
+    metadata = metadata or {}
+    chunks = chunk_blog(blog_text)
+    new_ids = [f"{blog_id}-{i}" for i in range(len(chunks))]
+    existing_ids = [i for i in store.list_ids(f"{blog_id}-") if i.rpartition("-")[0] == blog_id]
+    existing = store.fetch(existing_ids) if existing_ids else {}
+
+    def is_current(i):
+        old = existing.get(new_ids[i], {})
+        return old.get("hash") == chunk_hash(chunks[i]) and all(old.get(k) == v for k, v in metadata.items())
+
+    changed = [i for i in range(len(chunks)) if not is_current(i)]
+    if changed:
+        embeddings = embed_passages([chunks[i] for i in changed])
+        store.upsert(build_vectors(blog_id, chunks, embeddings, changed, metadata))
+
+    orphans = sorted(set(existing_ids) - set(new_ids))
+    if orphans:
+        store.delete(orphans)
+
+    for i, chunk in enumerate(chunks):
+        lexical_index.add(new_ids[i], chunk, dict(metadata, blog_id=blog_id))
+    for orphan in orphans:
+        lexical_index.remove(orphan)
+
+    if changed or orphans:
+        # Cached chatbot answers may now be stale
+        answer_cache.invalidate()
+    print(f"✅ Blog {blog_id} indexed: {len(changed)}/{len(chunks)} chunks embedded, {len(orphans)} removed")
+
+def rebuild_lexical_index():
+    """Re-chunk every live blog from Postgres into a fresh BM25 index"""
+    query = """
+        SELECT b.id, b.title, b.content, u.name, b.user_id, b.createdat
+        FROM blog.blogdetails b
+        JOIN consumer.userdetails u ON b.user_id = u.id
+        WHERE b.delete = 0
+    """
+    fresh = BM25Index()
+    for blog_id, title, content, username, user_id, createdat in db_display(query, None):
+        metadata = dict(blog_metadata(user_id, username, createdat), blog_id=blog_id)
+        for i, chunk in enumerate(chunk_blog(format_blog_text(title, username, content))):
+            fresh.add(f"{blog_id}-{i}", chunk, metadata)
+    lexical_index.replace_all(fresh)
+    print(f"Lexical index rebuilt with {len(fresh)} chunks")
+
+def _lexical_refresh_loop():
+    while True:
+        try:
+            rebuild_lexical_index()
+        except Exception as e:
+            print(f"Lexical index rebuild failed: {e}")
+        time.sleep(BM25_REFRESH_SECONDS)
+
+def start_lexical_index():
+    if HYBRID_RETRIEVAL:
+        threading.Thread(target=_lexical_refresh_loop, name="bm25-refresh", daemon=True).start()
 
 # -------------------------------
 # 5. Query Pinecone
 # -------------------------------
+def search(query_vector, top_k: int = 20, query_text: str | None = None, filter: dict | None = None):
+    """Vector search that skips chunks of deleted blogs (see vector_lifecycle.py).
+
+    `filter` is a metadata filter (author, createdat, user_id) applied inside
+    the index query. With query_text and HYBRID_RETRIEVAL on, dense candidates
+    are over-fetched and fused with BM25 candidates by reciprocal rank; the
+    fused list is HYBRID_TOP_K long.
+    """
+    hybrid = HYBRID_RETRIEVAL and query_text and len(lexical_index) > 0
+    results = store.query(
+        vector=query_vector,
+        top_k=HYBRID_CANDIDATES if hybrid else top_k,
+        filter=vector_lifecycle.live_filter(filter),
+        include_metadata=True
+    )
+    dense = vector_lifecycle.drop_tombstoned(results["matches"])
+    if not hybrid:
+        return dense
+    lexical = vector_lifecycle.drop_tombstoned(lexical_index.search(query_text, HYBRID_CANDIDATES, filter))
+    return reciprocal_rank_fusion(dense, lexical, top_k=HYBRID_TOP_K)
+
+def scoped_search(query_vector, question: str, top_k: int = 20):
+    """search() narrowed to the author / date range named in the question;
+    falls back to the unscoped search when the scope matches nothing"""
+    scope = query_understanding.understand(question)
+    if scope.filter:
+        matches = search(query_vector, top_k=top_k, query_text=question, filter=scope.filter)
+        if matches:
+            return matches
+        print(f"No matches in scope {scope}, searching everything")
+    return search(query_vector, top_k=top_k, query_text=question)
+
 def agentic_ai(user_query: str, conversation_history: str = ""):
     try:
         
@@ -128,29 +252,34 @@ def agentic_ai(user_query: str, conversation_history: str = ""):
         print(f"Error in query_rag: {e}")
         return "Sorry, I'm having trouble processing your request right now."
 
+class MockStream:
+    """Async stream with a single Groq-shaped chunk, used to report errors.
+    `failed` marks it so callers never cache the error text as an answer."""
+    failed = True
+
+    def __init__(self, text: str):
+        self.text = text
+
+    async def __aiter__(self):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.text))])
+
+def is_failure(stream) -> bool:
+    """True for the error fallbacks returned instead of a real completion"""
+    return getattr(stream, "failed", False)
+
 # Add this new streaming function
 async def query_rag_stream(user_query: str, conversation_history: str = ""):
     """Streaming version of RAG query function"""
     try:
-        # Embed query (same as before)
-        embed_model = "multilingual-e5-large"
-        query_emb = pc.inference.embed(
-            model=embed_model,
-            inputs=[user_query],
-            parameters={"input_type": "query"}
-        )
-
-        query_vector = query_emb.data[0].values
+        # Embed query (cached by content hash, see embeddings.py)
+        query_vector = await run_blocking(embed_query, user_query)
 
         # Search top-k (same as before)
-        results = index.query(
-            vector=query_vector,
-            top_k=20,
-            include_metadata=True
-        )
+        # Narrowed to an author / date range when the question names one
+        matches = await run_blocking(scoped_search, query_vector, user_query, top_k=20)
 
-        retrieved_chunks = [m["metadata"]["text"] for m in results["matches"]]
-        context = "\n".join(retrieved_chunks)
+        # Merge neighbouring chunks, drop near-duplicates, pack to the token budget
+        context = build_context(matches)
 
         # Same prompt as before
         prompt = f"""<System>
@@ -197,9 +326,8 @@ async def query_rag_stream(user_query: str, conversation_history: str = ""):
                     <Answer>
                 """
 
-        client = Groq(api_key=GROQ_API_KEY)
         # Use stream=True for streaming
-        stream = client.chat.completions.create(
+        stream = await async_client.chat.completions.create(
             model="openai/gpt-oss-120b",
             messages=[{"role": "user", "content": prompt}],
             stream=True  # Enable streaming
@@ -210,9 +338,6 @@ async def query_rag_stream(user_query: str, conversation_history: str = ""):
     except Exception as e:
         print(f"Error in query_rag_stream: {e}")
         # For errors, we'll need to yield an error message
-        class MockStream:
-            async def __aiter__(self):
-                yield {"choices": [{"delta": {"content": "Sorry, I'm having trouble processing your request right now."}}]}
-        return MockStream()
+        return MockStream("Sorry, I'm having trouble processing your request right now.")
 
 
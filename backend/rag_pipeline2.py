@@ -1,68 +1,24 @@
-from langchain_text_splitters import TokenTextSplitter
-from pinecone import Pinecone, ServerlessSpec
-from groq import Groq
+from groq import AsyncGroq
+from offload import run_blocking
+from embeddings import embed_query
+# Retrieval is shared with rag_pipeline
+from rag_pipeline import scoped_search, MockStream
+from context_builder import build_context
+import intent_router
 import os
 import json
 from dotenv import load_dotenv
 import asyncio
+import threading
 load_dotenv()
 
 # -------------------------------
 # 1. Setup keys
 # -------------------------------
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# -------------------------------
-# 2. Init Pinecone
-# -------------------------------
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index_name = "rag-blogs"
-
-# Create index if not exists
-if index_name not in [i["name"] for i in pc.list_indexes()]:
-    pc.create_index(
-        name=index_name,
-        dimension=1024,  
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-east-1")
-    )
-
-index = pc.Index(index_name)
-
-# -------------------------------
-# 3. Chunk blog into tokens
-# -------------------------------
-def chunk_blog(blog_text: str):
-    token_splitter = TokenTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50
-    )
-    return token_splitter.split_text(blog_text)
-
-# -------------------------------
-# 4. Add blog to Pinecone
-# -------------------------------
-def add_blog_to_pinecone(blog_id: str, blog_text: str):
-    chunks = chunk_blog(blog_text)
-    
-    embed_model = "multilingual-e5-large"
-    embeddings = pc.inference.embed(
-        model=embed_model,
-        inputs=chunks,
-        parameters={"input_type": "passage"}
-    )
-
-    vectors = []
-    for i, emb in enumerate(embeddings.data):
-        vectors.append({
-            "id": f"{blog_id}-{i}",
-            "values": emb.values,
-            "metadata": {"text": chunks[i]}
-        })
-
-    index.upsert(vectors=vectors)
-    print(f"Blog {blog_id} added with {len(vectors)} chunks")
+# One async client per process so HTTP connections are reused across turns
+client = AsyncGroq(api_key=GROQ_API_KEY)
 
 # -------------------------------
 # 5. Tool Definition
@@ -90,38 +46,49 @@ tools = [
 # -------------------------------
 # 6. RAG Knowledge Retrieval Function
 # -------------------------------
-def retrieve_knowledge(question: str):
-    """Retrieve relevant chunks from Pinecone for the given question"""
+def retrieve_knowledge(question: str, cancelled: threading.Event | None = None):
+    """Retrieve relevant chunks from Pinecone for the given question;
+    None when retrieval failed (as opposed to "" for nothing relevant).
+
+    `cancelled` is checked between steps: cancelling the asyncio task that
+    awaits this does not stop the offload thread running it.
+    """
     try:
-        embed_model = "multilingual-e5-large"
-        query_emb = pc.inference.embed(
-            model=embed_model,
-            inputs=[question],
-            parameters={"input_type": "query"}
-        )
+        if cancelled is not None and cancelled.is_set():
+            speculation_stats["embeds_skipped"] += 1
+            return None
+
+        # Embed query (cached by content hash, see embeddings.py)
+        query_vector = embed_query(question)
+
+        if cancelled is not None and cancelled.is_set():
+            speculation_stats["searches_skipped"] += 1
+            return None
         
-        query_vector = query_emb.data[0].values
+        # Search top-k relevant chunks, narrowed to an author / date range when the question names one
+        matches = scoped_search(query_vector, question, top_k=20)
         
-        # Search top-k relevant chunks
-        results = index.query(
-            vector=query_vector,
-            top_k=20,
-            include_metadata=True
-        )
-        
-        retrieved_chunks = [m["metadata"]["text"] for m in results["matches"]]
-        context = "\n".join(retrieved_chunks)
+        # Merge neighbouring chunks, drop near-duplicates, pack to the token budget
+        context = build_context(matches)
         return context
         
     except Exception as e:
         print(f"Error in retrieve_knowledge: {e}")
-        return ""
+        return None
+
+async def aretrieve_knowledge(question: str, cancelled: threading.Event | None = None):
+    """Run retrieve_knowledge on the offload pool so the event loop stays free"""
+    return await run_blocking(retrieve_knowledge, question, cancelled)
 
 # -------------------------------
 # 7. Generate Knowledge-Based Response
 # -------------------------------
 async def generate_knowledge_response(question: str, context: str, conversation_history: str = ""):
     """Generate streaming response using retrieved knowledge"""
+    if context is None:
+        # Retrieval failed: answering from an empty context would claim the
+        # topic is "beyond my knowledge base"
+        return MockStream("Sorry, I'm having trouble processing your request right now.")
     try:
         prompt = f"""<System>
 You are Bloggy, a helpful chatbot for a blog website. You must ONLY use the provided <Context> to answer questions.
@@ -148,8 +115,7 @@ You are Bloggy, a helpful chatbot for a blog website. You must ONLY use the prov
 <Answer>
 """
 
-        client = Groq(api_key=GROQ_API_KEY)
-        stream = client.chat.completions.create(
+        stream = await client.chat.completions.create(
             model="llama-3.3-70b-versatile",
             messages=[{"role": "user", "content": prompt}],
             stream=True
@@ -160,19 +126,38 @@ You are Bloggy, a helpful chatbot for a blog website. You must ONLY use the prov
     except Exception as e:
         print(f"Error in generate_knowledge_response: {e}")
         # Return error as mock stream
-        class MockStream:
-            async def __aiter__(self):
-                yield {"choices": [{"delta": {"content": "Sorry, I'm having trouble processing your request right now."}}]}
-        return MockStream()
+        return MockStream("Sorry, I'm having trouble processing your request right now.")
 
 # -------------------------------
 # 8. Main Agentic AI with Tool Calling
 # -------------------------------
+# Start retrieval for the raw query in parallel with the classifier call
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+SPECULATION_MIN_SIMILARITY = float(os.getenv("SPECULATION_MIN_SIMILARITY", "0.6"))
+# abandoned: speculative retrievals whose result was not used (chitchat, reworded
+# question, error); embeds_skipped / searches_skipped: work those actually avoided
+speculation_stats = {"hits": 0, "misses": 0, "abandoned": 0, "embeds_skipped": 0, "searches_skipped": 0}
+
+def question_similarity(a: str, b: str) -> float:
+    """Jaccard overlap of the word sets of two questions"""
+    words_a = set(a.lower().split())
+    words_b = set(b.lower().split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
 async def agentic_ai_with_tools(user_query: str, conversation_history: str = ""):
     """Main function that classifies intent and routes to appropriate response"""
     try:
-        client = Groq(api_key=GROQ_API_KEY)
-        
+        # Step 0: Local fast path - templates for chitchat, clear knowledge
+        # queries go straight to retrieval (see intent_router.py)
+        route = intent_router.route(user_query, conversation_history)
+        if route.intent == intent_router.CHITCHAT:
+            return route.reply
+        if route.intent == intent_router.KNOWLEDGE:
+            context = await aretrieve_knowledge(user_query)
+            return await generate_knowledge_response(user_query, context, conversation_history)
+
         # Step 1: Classify the user's intent using tool calling
         classification_prompt = f"""<System>
                                     You are Bloggy, a chatbot for a blog website. Analyze the user's message and determine if they need:
@@ -190,40 +175,67 @@ async def agentic_ai_with_tools(user_query: str, conversation_history: str = "")
 
                                     User: {user_query}"""
 
-        # Get response with potential tool calls
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": classification_prompt}],
-            tools=tools,
-            tool_choice="auto",
-            stream=False
-        )
-        
-        
-        # Step 2: Check if tool was called
-        if response.choices[0].message.tool_calls:
+        # Speculatively retrieve for the raw query while the classifier runs
+        speculative = None
+        stop_speculation = threading.Event()
+        if SPECULATIVE_RETRIEVAL:
+            speculative = asyncio.create_task(aretrieve_knowledge(user_query, stop_speculation))
+
+        def abandon_speculation():
+            if speculative and not stop_speculation.is_set():
+                speculation_stats["abandoned"] += 1
+                stop_speculation.set()
+                speculative.cancel()
+
+        try:
+            # Get response with potential tool calls
+            response = await client.chat.completions.create(
+                model="llama-3.3-70b-versatile",
+                messages=[{"role": "user", "content": classification_prompt}],
+                tools=tools,
+                tool_choice="auto",
+                stream=False
+            )
+            
+            # Step 2: Check if tool was called
+            tool_calls = response.choices[0].message.tool_calls
+            if not tool_calls:
+                abandon_speculation()
+                intent_router.log_decision(user_query, intent_router.CHITCHAT)
+                return response.choices[0].message.content
+
             # Knowledge-based query - use RAG workflow
-            tool_call = response.choices[0].message.tool_calls[0]
+            tool_call = tool_calls[0]
+            question = user_query
             if tool_call.function.name == "knowledge_base":
                 function_args = json.loads(tool_call.function.arguments)
                 question = function_args.get("question", user_query)
-                print(question)
-                # Retrieve context from knowledge base
-                context = retrieve_knowledge(question)
-                
-                # Generate streaming response with context
-                return await generate_knowledge_response(question, context, conversation_history)
-        
-        else:
-            return response.choices[0].message.content
+            else:
+                # knowledge_base is the only tool; treat a misnamed call as one for the raw query
+                print(f"Unknown tool {tool_call.function.name}, using knowledge_base")
+            intent_router.log_decision(user_query, intent_router.KNOWLEDGE)
+            print(question)
+            # Retrieve context from knowledge base, reusing the speculative
+            # result when the tool kept (nearly) the user's own wording
+            if speculative and question_similarity(question, user_query) >= SPECULATION_MIN_SIMILARITY:
+                speculation_stats["hits"] += 1
+                context = await speculative
+            else:
+                if speculative:
+                    speculation_stats["misses"] += 1
+                    abandon_speculation()
+                context = await aretrieve_knowledge(question)
+        except BaseException:
+            abandon_speculation()
+            raise
+
+        # Generate streaming response with context
+        return await generate_knowledge_response(question, context, conversation_history)
 
     except Exception as e:
         print(f"Error in agentic_ai_with_tools: {e}")
         # Return error as mock stream
-        class MockStream:
-            async def __aiter__(self):
-                yield {"choices": [{"delta": {"content": "Sorry, I'm having trouble right now. Please try again!"}}]}
-        return MockStream()
+        return MockStream("Sorry, I'm having trouble right now. Please try again!")
 
 # -------------------------------
 # 9. Usage Example
@@ -240,7 +252,7 @@ async def agentic_ai_with_tools(user_query: str, conversation_history: str = "")
 #     # Knowledge query example  
 #     print("=== Knowledge Query Example ===")
 #     stream2 = await agentic_ai_with_tools("explain about all the blogs made by abhi")
-#     for chunk in stream2:
+#     async for chunk in stream2:
 #         if hasattr(chunk, 'choices') and chunk.choices[0].delta.content:
 #             print(chunk.choices[0].delta.content, end='')
 #     print("\n")
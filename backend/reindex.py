@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import rag_pipeline
+from db import get_connection
+from embeddings import embed_passages
+
+# -------------------------------
+# Rebuild the vector index from blog.blogdetails
+# -------------------------------
+# Usage: python reindex.py [--batch-chunks 256] [--concurrency 4] [--resume]
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(__file__), "vector_data", "reindex_checkpoint.json")
+
+
+def load_checkpoint(path: str):
+    if not os.path.exists(path):
+        return ""
+    with open(path) as f:
+        return json.load(f).get("last_blog_id", "")
+
+
+def save_checkpoint(path: str, last_blog_id: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"last_blog_id": last_blog_id}, f)
+    os.replace(path + ".tmp", path)
+
+
+def stream_blogs(after_id: str, fetch_size: int):
+    """Yield live posts in id order through a server-side (named) cursor"""
+    query = """
+        SELECT b.id, b.title, b.content, u.name, b.user_id, b.createdat
+        FROM blog.blogdetails b
+        JOIN consumer.userdetails u ON b.user_id = u.id
+        WHERE b.delete = 0 AND b.id > %s
+        ORDER BY b.id
+    """
+    with get_connection() as connection:
+        with connection.cursor(name="reindex_blogs") as cursor:
+            cursor.itersize = fetch_size
+            cursor.execute(query, (after_id,))
+            yield from cursor
+        connection.rollback()
+
+
+def prune_stale(store, blog_id: str, keep: int):
+    """Remove chunk ids left over from a previous, longer chunking"""
+    wanted = {f"{blog_id}-{i}" for i in range(keep)}
+    stale = [i for i in store.list_ids(f"{blog_id}-") if i not in wanted]
+    if stale:
+        store.delete(stale)
+
+
+def reindex(batch_chunks: int, concurrency: int, checkpoint: str, resume: bool, fetch_size: int, prune: bool):
+    store = rag_pipeline.store
+    # Bulk mode for the local backend: persist at checkpoints, not on every upsert
+    autosave = getattr(store, "autosave", None)
+    if autosave:
+        store.autosave = False
+
+    after_id = load_checkpoint(checkpoint) if resume else ""
+    if after_id:
+        print(f"Resuming after blog {after_id}")
+
+    started = time.monotonic()
+    posts = chunks_done = 0
+    inflight = deque()
+
+    def upsert_batch(batch):
+        # One large embed call for every chunk of every post in the batch
+        embeddings = embed_passages([chunk for _, chunks, _ in batch for chunk in chunks])
+        vectors, start = [], 0
+        for blog_id, chunks, metadata in batch:
+            vectors.extend(rag_pipeline.build_vectors(blog_id, chunks, embeddings[start:start + len(chunks)], metadata=metadata))
+            start += len(chunks)
+        store.upsert(vectors)
+        if prune:
+            # After the upsert, so the post is never left without vectors
+            for blog_id, chunks, _ in batch:
+                prune_stale(store, blog_id, len(chunks))
+        return len(vectors)
+
+    def drain(limit: int):
+        nonlocal chunks_done
+        while len(inflight) > limit:
+            future, last_blog_id = inflight.popleft()
+            chunks_done += future.result()
+            if hasattr(store, "save"):
+                store.save()
+            save_checkpoint(checkpoint, last_blog_id)
+            elapsed = time.monotonic() - started
+            print(f"{posts} posts, {chunks_done} chunks, {chunks_done / elapsed:.1f} chunks/s")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        batch, batch_size = [], 0
+        for blog_id, title, content, username, user_id, createdat in stream_blogs(after_id, fetch_size):
+            chunks = rag_pipeline.chunk_blog(rag_pipeline.format_blog_text(title, username, content))
+            batch.append((blog_id, chunks, rag_pipeline.blog_metadata(user_id, username, createdat)))
+            batch_size += len(chunks)
+            posts += 1
+            if batch_size >= batch_chunks:
+                # A batch ends on a post boundary, so its last blog id is a safe checkpoint
+                inflight.append((pool.submit(upsert_batch, batch), blog_id))
+                batch, batch_size = [], 0
+                drain(concurrency - 1)
+        if batch:
+            inflight.append((pool.submit(upsert_batch, batch), batch[-1][0]))
+        drain(0)
+
+    if autosave:
+        store.autosave = True
+    elapsed = time.monotonic() - started
+    print(f"Reindexed {posts} posts / {chunks_done} chunks in {elapsed:.1f}s")
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the rag-blogs vector index from blog.blogdetails")
+    parser.add_argument("--batch-chunks", type=int, default=256, help="chunks per embed/upsert batch")
+    parser.add_argument("--concurrency", type=int, default=4, help="max batches in flight")
+    parser.add_argument("--fetch-size", type=int, default=500, help="rows per server-side cursor fetch")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--resume", action="store_true", help="continue after the last checkpointed blog")
+    parser.add_argument("--no-prune", dest="prune", action="store_false", help="keep chunks beyond the new chunk count")
+    args = parser.parse_args()
+    reindex(args.batch_chunks, args.concurrency, args.checkpoint, args.resume, args.fetch_size, args.prune)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import threading
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from dotenv import load_dotenv
+from cache import TTLCache
+load_dotenv()
+
+# -------------------------------
+# HTTP response cache for read endpoints
+# -------------------------------
+# Serialized JSON bodies are cached per key with a strong ETag (hash of the
+# body). Keys are tuples whose first item is the invalidation group:
+#   ("feed", page, limit, cursor, fields)  /getblogs
+#   ("blog:<id>",)                          /getblog/{id}
+#   ("user:<user_id>", limit, cursor, fields)  /myblogs
+# Writes call invalidate() with the groups they touch, so entries are dropped
+# as soon as the change commits instead of waiting for the TTL.
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+
+_entries = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+_lock = threading.Lock()
+_versions = {}  # group -> number of invalidations
+stats = {"not_modified": 0}
+
+
+def feed_group() -> str:
+    return "feed"
+
+
+def blog_group(blog_id: str) -> str:
+    return f"blog:{blog_id}"
+
+
+def user_group(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in [tag.strip() for tag in header.split(",")]
+
+
+def invalidate(*groups: str):
+    """Drop cached responses in `groups`; bumping the group version also stops
+    a read that started before the write from caching what it fetched"""
+    with _lock:
+        for group in groups:
+            _versions[group] = _versions.get(group, 0) + 1
+    for key, _ in _entries.items():
+        if key[0] in groups:
+            _entries.pop(key)
+
+
+def cached_json(request: Request, key: tuple, build, private: bool = False) -> Response:
+    """Serve `key` from the cache (304 when the client's ETag still matches),
+    otherwise call build() and cache its JSON body"""
+    entry = _entries.get(key)
+    if entry is None:
+        version = _versions.get(key[0], 0)
+        body = json.dumps(jsonable_encoder(build()), separators=(",", ":")).encode("utf-8")
+        entry = (body, make_etag(body))
+        with _lock:
+            if _versions.get(key[0], 0) == version:
+                _entries.set(key, entry)
+
+    body, etag = entry
+    # no-cache: browsers may keep the body but must revalidate (cheap 304) each time
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache" if private else "no-cache"}
+    if etag_matches(request, etag):
+        stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cache_stats() -> dict:
+    return dict(_entries.stats(), **stats)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+from dataclasses import dataclass, field
+from groq import AsyncGroq
+from dotenv import load_dotenv
+from cache import TTLCache
+from context_builder import estimate_tokens
+load_dotenv()
+
+# -------------------------------
+# 1. Settings
+# -------------------------------
+# Token budget for the history sent with each prompt (summary + recent turns)
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "1500"))
+# Share of the budget kept as verbatim recent turns after compaction
+SESSION_RECENT_SHARE = float(os.getenv("SESSION_RECENT_SHARE", "0.6"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "3600"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SUMMARY_MODEL = os.getenv("SESSION_SUMMARY_MODEL", "llama-3.1-8b-instant")
+
+client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+_sessions = TTLCache(maxsize=SESSION_MAX, ttl=SESSION_IDLE_TTL)
+_background = set()
+
+
+@dataclass
+class Session:
+    summary: str = ""
+    turns: list = field(default_factory=list)  # [(role, text)]
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+def format_turns(turns: list) -> str:
+    return "".join(f"{'User: ' if role == 'user' else 'Bot: '}{text}\n" for role, text in turns)
+
+
+# -------------------------------
+# 2. Session access
+# -------------------------------
+def get_session(client_id: str) -> Session:
+    session = _sessions.get(client_id)
+    if session is None:
+        session = Session()
+    # Re-setting refreshes the idle TTL
+    _sessions.set(client_id, session)
+    return session
+
+
+def history(client_id: str) -> str:
+    """Conversation history in the PreviousConversation prompt format"""
+    session = get_session(client_id)
+    text = ""
+    if session.summary:
+        text += f"Summary of earlier conversation: {session.summary}\n"
+    return text + format_turns(session.turns)
+
+
+def record_exchange(client_id: str, question: str, answer: str):
+    """Record a finished turn; compaction (if over budget) runs in the background"""
+    session = get_session(client_id)
+    session.turns.append(("user", question))
+    session.turns.append(("bot", answer))
+    task = asyncio.create_task(_compact_locked(session))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _compact_locked(session: Session):
+    async with session.lock:
+        await compact(session)
+
+
+def drop(client_id: str):
+    _sessions.pop(client_id)
+
+
+# -------------------------------
+# 3. Compaction
+# -------------------------------
+async def compact(session: Session):
+    """Fold the oldest turns into the running summary until the session fits
+    SESSION_TOKEN_BUDGET, keeping the most recent turns verbatim."""
+    total = estimate_tokens(session.summary) + estimate_tokens(format_turns(session.turns))
+    if total <= SESSION_TOKEN_BUDGET:
+        return
+
+    # Keep as many recent turns as fit in the recent share of the budget
+    recent_budget = SESSION_TOKEN_BUDGET * SESSION_RECENT_SHARE
+    keep, used = 0, 0
+    for role, text in reversed(session.turns):
+        cost = estimate_tokens(text)
+        if used + cost > recent_budget:
+            break
+        keep += 1
+        used += cost
+    old = session.turns[:len(session.turns) - keep]
+    if not old:
+        return
+
+    summary_budget = int(SESSION_TOKEN_BUDGET - used)
+    try:
+        session.summary = await summarize(session.summary, format_turns(old), summary_budget)
+    except Exception as e:
+        # Fall back to forgetting the oldest turns rather than growing unbounded
+        print(f"Session summary failed: {e}")
+    # Turns recorded while summarizing are kept
+    session.turns = session.turns[len(old):]
+
+
+async def summarize(previous_summary: str, transcript: str, max_tokens: int) -> str:
+    prompt = f"""Update the running summary of a chat between a user and Bloggy, a blog website chatbot.
+Keep names, topics, blog titles and open questions the user may refer back to. Be brief.
+
+<PreviousSummary>
+{previous_summary}
+</PreviousSummary>
+
+<NewTurns>
+{transcript}
+</NewTurns>
+
+Updated summary:"""
+    response = await client.chat.completions.create(
+        model=SUMMARY_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max(64, max_tokens),
+    )
+    return response.choices[0].message.content.strip()
@@ -0,0 +1,60 @@
+import asyncio
+import os
+
+# -------------------------------
+# Coalesce streamed LLM deltas into fewer, larger frames
+# -------------------------------
+# A frame is flushed once it holds STREAM_COALESCE_CHARS characters or its
+# first delta is STREAM_FLUSH_INTERVAL seconds old, whichever comes first.
+# Setting STREAM_COALESCE_CHARS=0 sends every delta on its own.
+STREAM_COALESCE_CHARS = int(os.getenv("STREAM_COALESCE_CHARS", "48"))
+STREAM_FLUSH_INTERVAL = float(os.getenv("STREAM_FLUSH_INTERVAL", "0.05"))
+
+
+async def deltas(stream):
+    """Yield the non-empty text deltas of a Groq chat completion stream"""
+    async for chunk in stream:
+        if hasattr(chunk.choices[0], 'delta') and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def coalesce(stream, max_chars: int = STREAM_COALESCE_CHARS, flush_interval: float = STREAM_FLUSH_INTERVAL):
+    """Yield batched text from a completion stream.
+
+    The consumer's send is awaited between frames, so a slow socket makes
+    deltas pile up into larger frames instead of queueing more of them.
+    """
+    loop = asyncio.get_running_loop()
+    source = deltas(stream)
+    buffer, size, deadline = [], 0, None
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(source.__anext__())
+            timeout = None if not buffer else max(0, deadline - loop.time())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # Flush interval elapsed while upstream is quiet
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+                continue
+            task, pending = pending, None
+            try:
+                text = task.result()
+            except StopAsyncIteration:
+                break
+            if not buffer:
+                deadline = loop.time() + flush_interval
+            buffer.append(text)
+            size += len(text)
+            if size >= max_chars:
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await source.aclose()
@@ -0,0 +1,178 @@
+import argparse
+import os
+import threading
+import time
+from db import db_display, db_update
+from vector_store import get_vector_store
+
+# -------------------------------
+# 1. Settings
+# -------------------------------
+TOMBSTONE_REFRESH_SECONDS = float(os.getenv("TOMBSTONE_REFRESH_SECONDS", "30"))
+COMPACTION_INTERVAL_SECONDS = float(os.getenv("COMPACTION_INTERVAL_SECONDS", "300"))
+COMPACTION_BATCH = int(os.getenv("COMPACTION_BATCH", "100"))
+
+_tombstones = set()
+_loaded_at = 0.0
+_lock = threading.Lock()
+_stop = threading.Event()
+_sweeper = None
+
+
+def blog_id_of(vector_id: str) -> str:
+    """'{blog_id}-{i}' -> blog_id"""
+    return vector_id.rpartition("-")[0] or vector_id
+
+
+# -------------------------------
+# 2. Tombstones
+# -------------------------------
+def add_tombstone(blog_id: str):
+    """Record a deleted blog; call inside the transaction that sets delete = 1"""
+    query = """
+        INSERT INTO blog.vector_tombstones (blog_id) VALUES (%s)
+        ON CONFLICT (blog_id) DO UPDATE SET deleted_at = now(), purged_at = NULL
+    """
+    db_update(query, (blog_id,))
+    with _lock:
+        _tombstones.add(blog_id)
+    drop_lexical([blog_id])
+
+
+def drop_lexical(blog_ids: list):
+    """Remove deleted blogs' chunks from the in-process BM25 index"""
+    # Imported here: rag_pipeline imports this module
+    import rag_pipeline
+    for blog_id in blog_ids:
+        rag_pipeline.lexical_index.remove_prefix(f"{blog_id}-")
+
+
+def pending_tombstones() -> set:
+    """Deleted blogs whose vectors may still be in the index (refreshed from
+    Postgres every TOMBSTONE_REFRESH_SECONDS so other workers' deletes show up)"""
+    global _tombstones, _loaded_at
+    if time.monotonic() - _loaded_at > TOMBSTONE_REFRESH_SECONDS:
+        try:
+            rows = db_display("SELECT blog_id FROM blog.vector_tombstones WHERE purged_at IS NULL", None)
+            with _lock:
+                _tombstones = {row[0] for row in rows}
+                _loaded_at = time.monotonic()
+        except Exception as e:
+            print(f"Could not refresh tombstones: {e}")
+    return set(_tombstones)
+
+
+def live_filter(extra: dict | None = None) -> dict | None:
+    """Vector query filter that hides chunks of deleted blogs until they are purged"""
+    tombstones = pending_tombstones()
+    clauses = [extra] if extra else []
+    if tombstones:
+        clauses.append({"blog_id": {"$nin": sorted(tombstones)}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def drop_tombstoned(matches: list) -> list:
+    """Safety net for vectors written before blog_id metadata existed"""
+    tombstones = pending_tombstones()
+    if not tombstones:
+        return matches
+    return [m for m in matches if blog_id_of(m["id"]) not in tombstones]
+
+
+# -------------------------------
+# 3. Compaction sweep
+# -------------------------------
+def compact(batch_size: int = COMPACTION_BATCH) -> int:
+    """Purge the vectors of up to batch_size tombstoned blogs in one delete"""
+    rows = db_display(
+        "SELECT blog_id FROM blog.vector_tombstones WHERE purged_at IS NULL ORDER BY deleted_at LIMIT %s",
+        (batch_size,),
+    )
+    blog_ids = [row[0] for row in rows]
+    if not blog_ids:
+        return 0
+    store = get_vector_store()
+    ids = []
+    for blog_id in blog_ids:
+        ids.extend(i for i in store.list_ids(f"{blog_id}-") if blog_id_of(i) == blog_id)
+    if ids:
+        store.delete(ids)
+    drop_lexical(blog_ids)
+    db_update("UPDATE blog.vector_tombstones SET purged_at = now() WHERE blog_id = ANY(%s)", (blog_ids,))
+    with _lock:
+        _tombstones.difference_update(blog_ids)
+    print(f"Compaction purged {len(ids)} vectors of {len(blog_ids)} deleted blogs")
+    return len(blog_ids)
+
+
+def compact_all() -> int:
+    total = 0
+    while True:
+        purged = compact()
+        total += purged
+        if purged < COMPACTION_BATCH:
+            return total
+
+
+def _sweep_loop():
+    while not _stop.wait(COMPACTION_INTERVAL_SECONDS):
+        try:
+            compact_all()
+        except Exception as e:
+            print(f"Compaction sweep error: {e}")
+
+
+def start_sweeper():
+    global _sweeper
+    _stop.clear()
+    _sweeper = threading.Thread(target=_sweep_loop, name="vector-compaction", daemon=True)
+    _sweeper.start()
+
+
+def stop_sweeper(timeout: float = 10):
+    _stop.set()
+    if _sweeper is not None:
+        _sweeper.join(timeout)
+
+
+# -------------------------------
+# 4. Consistency check
+# -------------------------------
+def check_consistency(sample: int = 10) -> dict:
+    """Compare live blogs in Postgres with blogs that have vectors"""
+    live = {row[0] for row in db_display("SELECT id FROM blog.blogdetails WHERE delete = 0", None)}
+    indexed = {blog_id_of(i) for i in get_vector_store().list_ids("")}
+    missing = live - indexed
+    stale = indexed - live
+    return {
+        "live_blogs": len(live),
+        "indexed_blogs": len(indexed),
+        "missing_in_index": len(missing),
+        "stale_in_index": len(stale),
+        "pending_tombstones": len(pending_tombstones()),
+        "missing_sample": sorted(missing)[:sample],
+        "stale_sample": sorted(stale)[:sample],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector index lifecycle maintenance")
+    parser.add_argument("command", choices=["compact", "check"])
+    parser.add_argument("--fix", action="store_true", help="with check: tombstone stale blogs and requeue missing ones")
+    args = parser.parse_args()
+    if args.command == "compact":
+        print(f"Purged {compact_all()} blogs")
+    else:
+        report = check_consistency()
+        for key, value in report.items():
+            print(f"{key}: {value}")
+        if args.fix:
+            import jobs
+            report = check_consistency(sample=None)
+            for blog_id in report["stale_sample"]:
+                add_tombstone(blog_id)
+            for blog_id in report["missing_sample"]:
+                jobs.enqueue_index_job(blog_id)
+            compact_all()
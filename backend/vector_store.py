@@ -0,0 +1,339 @@
+import atexit
+import json
+from abc import ABC, abstractmethod
+import os
+import threading
+import numpy as np
+from dotenv import load_dotenv
+load_dotenv()
+
+# -------------------------------
+# 1. Settings
+# -------------------------------
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")  # "pinecone" or "numpy"
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", os.path.join(os.path.dirname(__file__), "vector_data"))
+VECTOR_QUANTIZE = os.getenv("VECTOR_QUANTIZE", "none")  # "none" or "int8"
+# Autosave batches writes: the .npy files are rewritten at most this often
+VECTOR_SAVE_INTERVAL = float(os.getenv("VECTOR_SAVE_INTERVAL", "5"))
+INDEX_NAME = "rag-blogs"
+DIMENSION = 1024
+
+
+# -------------------------------
+# 2. Metadata filters (Pinecone syntax subset)
+# -------------------------------
+def match_filter(metadata: dict, flt: dict | None) -> bool:
+    """Evaluate a Pinecone-style filter ($eq/$ne/$in/$nin/$gt/$gte/$lt/$lte/$and/$or)"""
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(match_filter(metadata, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(match_filter(metadata, c) for c in cond):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, target in cond.items():
+            if op == "$eq" and value != target:
+                return False
+            if op == "$ne" and value == target:
+                return False
+            if op == "$in" and value not in target:
+                return False
+            if op == "$nin" and value in target:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+    return True
+
+
+# -------------------------------
+# 3. Interface
+# -------------------------------
+class VectorStore(ABC):
+    """Vectors are dicts of {"id", "values", "metadata"}; query returns
+    {"matches": [{"id", "score", "metadata"}]} like Pinecone."""
+
+    @abstractmethod
+    def upsert(self, vectors: list):
+        ...
+
+    @abstractmethod
+    def query(self, vector, top_k: int = 10, filter: dict | None = None, include_metadata: bool = True):
+        ...
+
+    @abstractmethod
+    def delete(self, ids: list):
+        ...
+
+    @abstractmethod
+    def fetch(self, ids: list) -> dict:
+        """Metadata of the given ids that exist, as {id: metadata}"""
+
+    @abstractmethod
+    def list_ids(self, prefix: str = ""):
+        ...
+
+    def delete_prefix(self, prefix: str):
+        ids = list(self.list_ids(prefix))
+        if ids:
+            self.delete(ids)
+        return len(ids)
+
+
+# -------------------------------
+# 4. Pinecone backend
+# -------------------------------
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index_name: str = INDEX_NAME, pc=None):
+        from pinecone import Pinecone, ServerlessSpec
+        self.pc = pc or Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        # Create index if not exists
+        if index_name not in [i["name"] for i in self.pc.list_indexes()]:
+            self.pc.create_index(
+                name=index_name,
+                dimension=DIMENSION,
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region="us-east-1")
+            )
+        self.index = self.pc.Index(index_name)
+
+    def upsert(self, vectors: list):
+        for start in range(0, len(vectors), 100):
+            self.index.upsert(vectors=vectors[start:start + 100])
+
+    def query(self, vector, top_k: int = 10, filter: dict | None = None, include_metadata: bool = True):
+        kwargs = {"vector": list(vector), "top_k": top_k, "include_metadata": include_metadata}
+        if filter:
+            kwargs["filter"] = filter
+        results = self.index.query(**kwargs)
+        return {"matches": [
+            {"id": m["id"], "score": m["score"], "metadata": m.get("metadata") or {}}
+            for m in results["matches"]
+        ]}
+
+    def delete(self, ids: list):
+        for start in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[start:start + 1000])
+
+    def fetch(self, ids: list) -> dict:
+        found = {}
+        for start in range(0, len(ids), 100):
+            response = self.index.fetch(ids=ids[start:start + 100])
+            for vid, vector in response.vectors.items():
+                found[vid] = vector.metadata or {}
+        return found
+
+    def list_ids(self, prefix: str = ""):
+        for page in self.index.list(prefix=prefix):
+            yield from page
+
+
+# -------------------------------
+# 5. In-process NumPy backend
+# -------------------------------
+class NumpyVectorStore(VectorStore):
+    """Exact cosine search over a row-normalized matrix.
+
+    With quantize="int8" rows are stored as int8 plus a per-row scale (4x less
+    memory, small recall loss). Data is persisted as .npy files that are
+    memory-mapped on load, so a restart does not re-embed or copy the corpus.
+
+    Rows live in a buffer with spare capacity, so an upsert writes only its own
+    rows; ids/metadata are replaced rather than appended to, so a query's
+    snapshot never changes length under it. Autosave writes at most every
+    VECTOR_SAVE_INTERVAL seconds (and at exit).
+    """
+
+    def __init__(self, path: str = VECTOR_STORE_PATH, quantize: str = VECTOR_QUANTIZE, autosave: bool = True):
+        self.path = path
+        self.quantize = quantize
+        self.autosave = autosave
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._dirty = False
+        self.ids = []
+        self.metadata = []
+        self._pos = {}
+        self.matrix = np.zeros((0, DIMENSION), dtype=np.int8 if quantize == "int8" else np.float32)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self._load()
+        # matrix/scales are views of the first len(ids) rows of these
+        self._rows, self._row_scales = self.matrix, self.scales
+        atexit.register(self.flush)
+
+    def _files(self):
+        return (os.path.join(self.path, "vectors.npy"),
+                os.path.join(self.path, "scales.npy"),
+                os.path.join(self.path, "meta.json"))
+
+    def _load(self):
+        vec_file, scale_file, meta_file = self._files()
+        if not os.path.exists(meta_file):
+            return
+        with open(meta_file) as f:
+            meta = json.load(f)
+        self.ids = meta["ids"]
+        self.metadata = meta["metadata"]
+        self._pos = {vid: i for i, vid in enumerate(self.ids)}
+        self.matrix = np.load(vec_file, mmap_mode="r")
+        if self.quantize == "int8":
+            self.scales = np.load(scale_file, mmap_mode="r")
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                matrix, scales, ids, metadata = self.matrix, self.scales, self.ids, self.metadata
+                self._dirty = False
+            os.makedirs(self.path, exist_ok=True)
+            vec_file, scale_file, meta_file = self._files()
+            # Write to temp files and swap so a crash never leaves a torn index
+            np.save(vec_file + ".tmp.npy", np.asarray(matrix))
+            os.replace(vec_file + ".tmp.npy", vec_file)
+            if self.quantize == "int8":
+                np.save(scale_file + ".tmp.npy", np.asarray(scales))
+                os.replace(scale_file + ".tmp.npy", scale_file)
+            with open(meta_file + ".tmp", "w") as f:
+                json.dump({"ids": ids, "metadata": metadata}, f)
+            os.replace(meta_file + ".tmp", meta_file)
+
+    def flush(self):
+        """Save now if there are unsaved changes"""
+        with self._lock:
+            self._save_timer = None
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def _changed(self):
+        # Called with the lock held
+        self._dirty = True
+        if self.autosave and self._save_timer is None:
+            self._save_timer = threading.Timer(VECTOR_SAVE_INTERVAL, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _encode(self, values: np.ndarray):
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values = values / np.where(norms == 0, 1, norms)
+        if self.quantize != "int8":
+            return values.astype(np.float32), None
+        scales = np.abs(values).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.round(values / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _reserve(self, size: int):
+        # Grow geometrically; the memory-mapped arrays from _load are read-only
+        if size <= len(self._rows) and self._rows.flags.writeable:
+            return
+        capacity = max(size, 2 * len(self._rows), 1024)
+        count = len(self.ids)
+        rows = np.empty((capacity, DIMENSION), dtype=self.matrix.dtype)
+        rows[:count] = self.matrix
+        self._rows = rows
+        if self.quantize == "int8":
+            row_scales = np.empty(capacity, dtype=np.float32)
+            row_scales[:count] = self.scales
+            self._row_scales = row_scales
+
+    def upsert(self, vectors: list):
+        if not vectors:
+            return
+        rows, scales = self._encode(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+        with self._lock:
+            ids, metadata = list(self.ids), list(self.metadata)
+            added = len({v["id"] for v in vectors if v["id"] not in self._pos})
+            self._reserve(len(ids) + added)
+            for i, v in enumerate(vectors):
+                pos = self._pos.get(v["id"])
+                if pos is None:
+                    pos = self._pos[v["id"]] = len(ids)
+                    ids.append(v["id"])
+                    metadata.append(v.get("metadata") or {})
+                else:
+                    metadata[pos] = v.get("metadata") or {}
+                self._rows[pos] = rows[i]
+                if scales is not None:
+                    self._row_scales[pos] = scales[i]
+            self.ids, self.metadata = ids, metadata
+            self.matrix = self._rows[:len(ids)]
+            if self.quantize == "int8":
+                self.scales = self._row_scales[:len(ids)]
+            self._changed()
+
+    def query(self, vector, top_k: int = 10, filter: dict | None = None, include_metadata: bool = True):
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1)
+        with self._lock:
+            matrix, scales, ids, metadata = self.matrix, self.scales, self.ids, self.metadata
+        if not ids:
+            return {"matches": []}
+        scores = matrix @ q
+        if self.quantize == "int8":
+            scores = scores * scales
+        if filter:
+            mask = np.fromiter((match_filter(m, filter) for m in metadata), dtype=bool, count=len(metadata))
+            scores = np.where(mask, scores, -np.inf)
+        k = min(top_k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return {"matches": [
+            {"id": ids[i], "score": float(scores[i]), "metadata": metadata[i] if include_metadata else {}}
+            for i in top if scores[i] != -np.inf
+        ]}
+
+    def delete(self, ids: list):
+        with self._lock:
+            drop = {self._pos[i] for i in ids if i in self._pos}
+            if not drop:
+                return
+            keep = [i for i in range(len(self.ids)) if i not in drop]
+            self.matrix = np.asarray(self.matrix)[keep]
+            if self.quantize == "int8":
+                self.scales = np.asarray(self.scales)[keep]
+            self.ids = [self.ids[i] for i in keep]
+            self.metadata = [self.metadata[i] for i in keep]
+            self._pos = {vid: i for i, vid in enumerate(self.ids)}
+            self._rows, self._row_scales = self.matrix, self.scales
+            self._changed()
+
+    def fetch(self, ids: list) -> dict:
+        with self._lock:
+            return {i: self.metadata[self._pos[i]] for i in ids if i in self._pos}
+
+    def list_ids(self, prefix: str = ""):
+        with self._lock:
+            return [i for i in self.ids if i.startswith(prefix)]
+
+
+# -------------------------------
+# 6. Shared instance
+# -------------------------------
+_store = None
+_store_lock = threading.Lock()
+
+def get_vector_store() -> VectorStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if VECTOR_BACKEND == "numpy":
+                    _store = NumpyVectorStore()
+                else:
+                    _store = PineconeVectorStore()
+    return _store
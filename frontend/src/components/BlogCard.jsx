@@ -11,9 +11,11 @@ import { Link } from 'react-router-dom';
 import axios from 'axios';
 const BlogCard = React.memo(function BlogCard({ blog, id, del }) {
   const imageSrc = useMemo(() => {
-    if (!blog.imageUrl) return null;
-    return `http://localhost:8000${blog.imageUrl}`;
-  }, [blog.imageUrl]);
+    // Thumbnail once the backend has processed the upload, the original until then
+    const url = blog.imageVariants?.thumb || blog.imageUrl;
+    if (!url) return null;
+    return `http://localhost:8000${url}`;
+  }, [blog.imageUrl, blog.imageVariants]);
 
   const handleDelete = async (id) => {
     try {
@@ -163,10 +163,9 @@ export default function ChatBot() {
     setBotMessageId(botMessageId)
 
     streamingMessageIdRef.current = botMessageId
-    // Send message via WebSocket
+    // Send message via WebSocket (history is kept server-side per client id)
     wsRef.current.send(JSON.stringify({
-      current_request: userMessage,
-      previous_context: messages
+      current_request: userMessage
     }))
   }
 
@@ -9,14 +9,14 @@ import { set } from 'zod';
 
 function Home() {
   const [blogs, setBlogs] = useState([]);
-  const [page, setPage] = useState(1);
+  const [cursor, setCursor] = useState(null);
   const [hasMore, setHasMore] = useState(true);
   const [hasToken, setHasToken] = useState(false);
   const limit = 6; // Number of blogs per page
   const [falseContent, setFalseContent] = useState(false);
 
   useEffect(() => {
-    fetchBlogs(1);
+    fetchBlogs(null);
     
     if(localStorage.getItem("token")){
       setHasToken(true);
@@ -24,28 +24,22 @@ function Home() {
   }, []);
 
   
-  const fetchBlogs = async (pageNum) => {
+  // Keyset paging: pass back next_cursor instead of a page number
+  const fetchBlogs = async (nextCursor) => {
     try {
       const response = await axios.get(`http://localhost:8000/getblogs`, {
-        params: {
-          page: pageNum,
-          limit: limit
-        },
+        params: nextCursor ? { limit: limit, cursor: nextCursor } : { limit: limit },
       });
       
       const newBlogs = response.data.blogs;
       
-      
-      
-      if (pageNum === 1) {
-        setHasMore(true);
+      if (!nextCursor) {
         setBlogs(newBlogs);
       } else {
         setBlogs(prevBlogs => [...prevBlogs, ...newBlogs]);
       }
-      if (!newBlogs || newBlogs.length < limit) {
-        setHasMore(false);
-      }
+      setCursor(response.data.next_cursor);
+      setHasMore(Boolean(response.data.next_cursor));
     } catch (error) {
       console.error("Error fetching blogs:", error);
       setHasMore(false);
@@ -54,9 +48,7 @@ function Home() {
 
  
   const loadMore = () => {
-    const nextPage = page + 1;
-    setPage(nextPage);
-    fetchBlogs(nextPage);
+    fetchBlogs(cursor);
   };
 
  
@@ -69,8 +61,7 @@ function Home() {
         }
       });
       
-      fetchBlogs(1);
-      setPage(1);
+      fetchBlogs(null);
 
     } catch (e) {
       if (e.response && e.response.status === 410) {
@@ -1,26 +1,34 @@
 import axios from 'axios';
 import React, { useEffect, useState } from 'react';
 import BlogCard from '../components/BlogCard.jsx';
+import InfiniteScroll from 'react-infinite-scroll-component';
 import { useNavigate } from 'react-router-dom';
 const MyBlog = () => {
   const [myBlogs, setMyBlogs] = useState([]);
+  const [cursor, setCursor] = useState(null);
+  const [hasMore, setHasMore] = useState(true);
   const navigate = useNavigate();
 
-  useEffect(() => {
-    const fetchMyBlogs = async () => {
-      try {
-        const response = await axios.get('http://localhost:8000/myblogs', {
-          headers: {
-            "Authorization": `Bearer ${localStorage.getItem("token")}`
-          }
-        });
-        setMyBlogs(response.data.blogs);
-      } catch (error) {
-        console.error("Error fetching my blogs:", error);
-      }
-    };
+  const fetchMyBlogs = async (nextCursor) => {
+    try {
+      const response = await axios.get('http://localhost:8000/myblogs', {
+        params: nextCursor ? { cursor: nextCursor } : {},
+        headers: {
+          "Authorization": `Bearer ${localStorage.getItem("token")}`
+        }
+      });
+      const newBlogs = response.data.blogs;
+      setMyBlogs(prevBlogs => nextCursor ? [...prevBlogs, ...newBlogs] : newBlogs);
+      setCursor(response.data.next_cursor);
+      setHasMore(Boolean(response.data.next_cursor));
+    } catch (error) {
+      console.error("Error fetching my blogs:", error);
+      setHasMore(false);
+    }
+  };
 
-    fetchMyBlogs();
+  useEffect(() => {
+    fetchMyBlogs(null);
   }, []);
 
   return (
@@ -36,12 +44,23 @@ const MyBlog = () => {
             <h1 className="text-3xl font-bold mt-4 text-black">Your Blogs</h1>
         </div>
         </div>
+        <InfiniteScroll
+            dataLength={myBlogs.length}
+            next={() => fetchMyBlogs(cursor)}
+            hasMore={hasMore}
+            loader={
+            <div className="flex justify-center m-4">
+                <h4 className="text-center text-gray-500">Loading more blogs...</h4>
+            </div>
+            }
+        >
             <div className="flex flex-wrap ml-[3vw] items-center gap-4 mt-4">
 
             {myBlogs.map(blog => (
                 <BlogCard key={blog.id} blog={blog} id={blog.id} del={true} />
             ))}
             </div>
+        </InfiniteScroll>
         </>
     );
 };